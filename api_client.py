@@ -0,0 +1,140 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+
+# الطلبات التي يمكن إعادتها دون خطر تكرار أثرها على الخادم
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# أخطاء مؤقتة من الخادم أو الوكيل
+RETRY_STATUSES = {502, 503, 504}
+# ما يُرجعه events() عند كل نبضة من الخادم (تعليق ": ping")
+HEARTBEAT = {'event': 'heartbeat'}
+
+
+class ApiClient:
+    """عميل HTTP مشترك لتطبيق الموبايل: اتصالات مستمرة (keep-alive) ومهلة اتصال منفصلة عن مهلة القراءة،
+    وإعادة المحاولة مع تأخير أُسّي عشوائي للطلبات الآمنة فقط"""
+
+    def __init__(self, base_url, connect_timeout=None, read_timeout=None, retries=None,
+                 backoff=None, backoff_max=None, pool_size=8):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout or float(os.getenv('API_CONNECT_TIMEOUT', 3.05))
+        self.read_timeout = read_timeout or float(os.getenv('API_READ_TIMEOUT', 10))
+        self.retries = retries if retries is not None else int(os.getenv('API_RETRIES', 3))
+        self.backoff = backoff or float(os.getenv('API_BACKOFF', 0.5))
+        self.backoff_max = backoff_max or float(os.getenv('API_BACKOFF_MAX', 8))
+
+        self.session = requests.Session()
+        # إعادة المحاولة تُدار هنا (وليس في urllib3) لكي لا تُعاد طلبات POST
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'ONAMob'
+
+        self._timings = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def delay(self, attempt):
+        """تأخير أُسّي مع عشوائية كاملة (لا تعيد كل الهواتف المحاولة في نفس اللحظة)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def request(self, method, path, idempotent=None, timeout=None, **kwargs):
+        """إرسال طلب؛ idempotent=True يسمح بإعادة طلب POST (مثلاً مع مفتاح منع التكرار)"""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + self.retries if idempotent else 1
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(method, path, None, start, attempt, type(e).__name__)
+                if last_attempt:
+                    raise
+                time.sleep(self.delay(attempt))
+                continue
+
+            self._record(method, path, response.status_code, start, attempt)
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                time.sleep(self.delay(attempt))
+                continue
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def events(self, path, params=None, last_event_id=None, heartbeat=20):
+        """قراءة قناة أحداث (Server-Sent Events)؛ يُرجع قاموساً لكل حدث (id, event, data)
+        وHEARTBEAT لكل نبضة، فيستطيع المستهلك التوقف وإغلاق الاتصال دون انتظار حدث حقيقي.
+        مهلة القراءة أطول من فترة النبضة: انقطاع الاتصال الصامت يُكتشف ويُرفع كخطأ"""
+        headers = {'Accept': 'text/event-stream'}
+        if last_event_id:
+            headers['Last-Event-ID'] = str(last_event_id)
+        start = time.perf_counter()
+        with self.session.get(f"{self.base_url}{path}", params=params, headers=headers, stream=True,
+                              timeout=(self.connect_timeout, heartbeat * 2)) as response:
+            self._record('GET', path, response.status_code, start, 0)
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            event = {}
+            # chunk_size=None: كل حدث يُقرأ فور وصوله
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line:
+                    if 'data' in event:
+                        yield event
+                    event = {}
+                    continue
+                if line.startswith(':'):
+                    yield HEARTBEAT
+                    continue
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                event[field] = f"{event['data']}\n{value}" if field == 'data' and 'data' in event else value
+
+    def _record(self, method, path, status, start, attempt, error=None):
+        with self._lock:
+            self._timings.append({
+                'method': method,
+                'path': path,
+                'status': status,
+                'ms': round((time.perf_counter() - start) * 1000, 1),
+                'attempt': attempt,
+                'error': error,
+                'at': time.time()
+            })
+
+    def timings(self):
+        """آخر الطلبات المسجلة (للتشخيص)"""
+        with self._lock:
+            return list(self._timings)
+
+    def stats(self):
+        """ملخص أزمنة الطلبات الأخيرة"""
+        timings = self.timings()
+        durations = sorted(item['ms'] for item in timings if item['error'] is None)
+
+        def percentile(p):
+            return durations[min(len(durations) - 1, int(len(durations) * p))] if durations else None
+
+        return {
+            'requests': len(timings),
+            'errors': sum(1 for item in timings if item['error'] is not None),
+            'retries': sum(1 for item in timings if item['attempt'] > 0),
+            'avg_ms': round(sum(durations) / len(durations), 1) if durations else None,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+        }
+
+    def close(self):
+        self.session.close()
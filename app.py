@@ -1,12 +1,21 @@
 import os
 import sys
+
+if __name__ == '__main__':
+    # ONA_SERVER_MODE=production مع WEB_WORKER_CLASS=gevent: الترقيع قبل أي استيراد آخر (مثل server.main)
+    from server import patch_async_worker
+    patch_async_worker(os.environ.get('ONA_SERVER_MODE', 'desktop'))
+
 import json
 import re
+import hmac
 import webbrowser
 import threading
+import time
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 from functools import wraps
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, stream_with_context
 
 # دالة لتحديد المسار الصحيح للموارد عند التشغيل كـ EXE
 def resource_path(relative_path):
@@ -16,37 +25,61 @@ def resource_path(relative_path):
 
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
+from werkzeug.http import is_resource_modified
 from dotenv import load_dotenv
 
 # تحميل متغيرات البيئة قبل استيراد النماذج
 load_dotenv()
 
-from models import db, User, Complaint, AuditLog
+from models import (db, cipher, User, Complaint, AuditLog, ComplaintNameToken, BLIND_INDEX_NAMES,
+                    blind_index, normalize_phone, normalize_id_card, name_tokens)
 from translations import TRANSLATIONS
+from centers import ONA_CENTERS, ALL_COMMUNES, CENTERS_VERSION, CENTERS_JSON, get_center_by_commune
+from audit import AuditWriter
+from stats import StatusCounters, STATUS_KEYS
+from pagination import keyset_paginate
+from search import ComplaintSearchIndex
+from tracking import TrackingIdGenerator, normalize_tracking_id
+from cache import TTLCache
+from assets import StaticAssets
+from compression import Compressor
+from metrics import Metrics
+from slow_queries import SlowQueryLog
+from events import StatusBroker, event_id
+from export import parse_columns, parse_date, export_statement, iter_export_chunks, iter_csv, iter_xlsx, write_xlsx
+from server import server_options, stream_limit, events_enabled
+from storage import configure_storage, init_storage, storage_report, print_storage_report, upgrade_schema
+import ratelimit_storage  # تسجيل مخطط sqlite:// لدى محدد السرعة
 
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+import click
 
 # إنشاء التطبيق
 app = Flask(__name__, 
             template_folder=resource_path('templates'),
             static_folder=resource_path('static'))
 
+# قياسات الأداء (/metrics)؛ تُسجل قبل كل المعالجات لكي يشمل القياس CSRF ومحدد السرعة
+metrics = Metrics(app)
+metrics.instrument_cipher(cipher)
+
 # تفعيل حماية CSRF
 csrf = CSRFProtect(app)
 
-# إعداد محدد السرعة (Rate Limiter) لمنع الإغراق
-limiter = Limiter(
-    get_remote_address,
-    app=app,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
+# ضغط الاستجابات النصية (يُسجل أولاً لكي يُنفذ بعد كل معالجات after_request الأخرى)
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+app.config['COMPRESS_BR_LEVEL'] = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+compressor = Compressor(app)
 
-# تعطيل Jinja2 caching
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-app.jinja_env.cache = None
+# وضع الإنتاج: تخزين القوالب وبصمات ملفات static (انظر assets.py)؛ التطوير بدون أي تخزين
+app.config['ASSET_CACHING'] = os.environ.get('ASSET_CACHING', str(
+    'production' in (os.environ.get('ONA_SERVER_MODE'), os.environ.get('FLASK_ENV'))
+)) == 'True'
 
 # إعداد مسارات قاعدة البيانات بشكل يضمن بقاءها بجانب ملف البرنامج (EXE)
 if hasattr(sys, '_MEIPASS'):
@@ -58,23 +91,105 @@ else:
 
 INSTANCE_DIR = os.path.join(BASE_DIR, 'instance')
 os.makedirs(INSTANCE_DIR, exist_ok=True)
-DB_PATH = os.path.join(INSTANCE_DIR, 'ona_complaints.db')
+# ONA_DB_PATH: قاعدة بيانات بديلة (مثلاً قاعدة مؤقتة لاختبار الحمل في benchmark.py)
+DB_PATH = os.environ.get('ONA_DB_PATH') or os.path.join(INSTANCE_DIR, 'ona_complaints.db')
+
+# قياسات كل العمال في ملف SQLite مشترك تُكتب كل METRICS_FLUSH_INTERVAL ثانية؛
+# METRICS_TOKEN يسمح لـ Prometheus بالقراءة (Authorization: Bearer) دون جلسة تسجيل دخول
+app.config['METRICS_DB'] = os.environ.get('METRICS_DB', os.path.join(INSTANCE_DIR, 'metrics.db'))
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5.0))
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+metrics.init_store(app)
+
+# إعداد محدد السرعة (Rate Limiter) لمنع الإغراق
+# العدادات في ملف SQLite مشترك بين كل العمليات وتبقى بعد إعادة التشغيل
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'True') == 'True'
+limiter = Limiter(
+    get_remote_address,
+    app=app,
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri=os.environ.get('RATELIMIT_STORAGE_URI', f"sqlite:///{os.path.join(INSTANCE_DIR, 'ratelimit.db')}"),
+    strategy="sliding-window-counter",
+    on_breach=metrics.rate_limited
+)
 
 # إعدادات الأمان
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'default-key-for-dev')
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# WAL ومهلة الانتظار ومجمع الاتصالات (انظر storage.py)
+configure_storage(app)
 app.config['DEBUG'] = os.environ.get('DEBUG', 'True') == 'True'
 app.config['SESSION_COOKIE_SECURE'] = False  # تم التعطيل للعمل على HTTP
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
 
+# إعدادات كتابة سجل التدقيق على دفعات
+app.config['AUDIT_BATCH_SIZE'] = int(os.environ.get('AUDIT_BATCH_SIZE', 100))
+app.config['AUDIT_FLUSH_INTERVAL'] = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+app.config['AUDIT_MAX_QUEUE'] = int(os.environ.get('AUDIT_MAX_QUEUE', 10000))
+
+# الحد الأقصى لعدد الشكاوى في طلب الإدخال بالجملة
+app.config['BULK_MAX_ITEMS'] = int(os.environ.get('BULK_MAX_ITEMS', 500))
+
+# ذاكرة البيانات الشخصية المفكوكة (في الذاكرة فقط، لا تُكتب على القرص أبداً)
+app.config['PII_CACHE_SIZE'] = int(os.environ.get('PII_CACHE_SIZE', 1000))
+app.config['PII_CACHE_TTL'] = int(os.environ.get('PII_CACHE_TTL', 120))
+
+# ذاكرة بيانات التتبع العامة (المدة القصيرة تحد من التأخر بين العمال)
+app.config['TRACKING_CACHE_SIZE'] = int(os.environ.get('TRACKING_CACHE_SIZE', 5000))
+app.config['TRACKING_CACHE_TTL'] = int(os.environ.get('TRACKING_CACHE_TTL', 30))
+
+# الحد الأقصى لأرقام التتبع في طلب /api/track/batch
+app.config['TRACK_BATCH_MAX'] = int(os.environ.get('TRACK_BATCH_MAX', 50))
+
+# قناة أحداث التتبع (SSE): النبضة، فترة مراقبة قاعدة البيانات، حد المشتركين لكل عامل، وعمر الاتصال
+# (حد المشتركين الافتراضي من نوع العامل: انظر server.stream_limit؛ EVENTS_ENABLED=False يعطل القنوات)
+app.config['EVENTS_HEARTBEAT'] = int(os.environ.get('EVENTS_HEARTBEAT', 20))
+app.config['EVENTS_POLL_INTERVAL'] = float(os.environ.get('EVENTS_POLL_INTERVAL', 2.0))
+app.config['EVENTS_MAX_SUBSCRIBERS'] = (int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 0)) or stream_limit(server_options())
+                                       if events_enabled() else 0)
+app.config['EVENTS_MAX_AGE'] = int(os.environ.get('EVENTS_MAX_AGE', 600))
+# أقصى عدد تغييرات تُعاد للوحة التحكم عند استئناف الاتصال
+app.config['DASHBOARD_RESUME_MAX'] = int(os.environ.get('DASHBOARD_RESUME_MAX', 500))
+# فترة الاستعلام الدوري للوحة التحكم (بالثواني) حين تكون القنوات مشغولة؛ حد /api/dashboard/changes يُحسب منها
+app.config['DASHBOARD_POLL_INTERVAL'] = int(os.environ.get('DASHBOARD_POLL_INTERVAL', 30))
+
+# سجل الاستعلامات البطيئة (معطل افتراضياً): الحد بالميلي ثانية، ملف السجل (يُدور خارجياً بـ logrotate)
+# وملف SQLite المشترك بين العمال لترتيب أكثر الاستعلامات كلفة
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 0))
+app.config['SLOW_QUERY_LOG'] = os.environ.get('SLOW_QUERY_LOG', os.path.join(INSTANCE_DIR, 'slow_queries.log'))
+app.config['SLOW_QUERY_DB'] = os.environ.get('SLOW_QUERY_DB', os.path.join(INSTANCE_DIR, 'slow_queries.db'))
+
+# مدة صلاحية عدادات الإحصائيات قبل إعادة مطابقتها مع الجدول (بالثواني)
+app.config['STATS_RECONCILE_INTERVAL'] = int(os.environ.get('STATS_RECONCILE_INTERVAL', 300))
+# أقصى تأخر لظهور تغييرات العمال الآخرين في الإحصائيات (فحص MAX(updated_at) قبل القراءة، بالثواني)
+app.config['STATS_CHECK_INTERVAL'] = float(os.environ.get('STATS_CHECK_INTERVAL', 2.0))
+
 # إنشاء مجلد البيانات
 os.makedirs('instance', exist_ok=True)
 
 # تهيئة قاعدة البيانات
 db.init_app(app)
+init_storage(app, db)
+metrics.init_engine(app, db)
+slow_queries = SlowQueryLog(app, db)
+
+# كاتب سجل التدقيق غير المتزامن
+audit_writer = AuditWriter(app, db, AuditLog.__table__)
+
+# عدادات حالات الشكاوى للوحات التحكم
+status_counters = StatusCounters(app, db, Complaint)
+
+# البيانات الشخصية المفكوكة لكل شكوى، مرتبطة بـ updated_at
+pii_cache = TTLCache(app.config['PII_CACHE_SIZE'], app.config['PII_CACHE_TTL'])
+
+# بيانات التتبع العامة حسب رقم التتبع (تُلغى عند تحديث الشكوى)
+tracking_cache = TTLCache(app.config['TRACKING_CACHE_SIZE'], app.config['TRACKING_CACHE_TTL'])
+
+# فهرس البحث النصي الكامل للشكاوى
+search_index = ComplaintSearchIndex(app, db, Complaint)
 
 # إعداد نظام تسجيل الدخول
 login_manager = LoginManager()
@@ -98,29 +213,25 @@ def set_language(lang):
         session['lang'] = lang
     return redirect(request.referrer or url_for('index'))
 
-# بيانات المراكز
-ONA_CENTERS = {
-    'ferdjioua': {'name': 'مركز فرجيوة', 'communes': ['فرجيوة', 'عين البضاء احريش', 'بني قشة']},
-    'mila': {'name': 'مركز ميلة', 'communes': ['ميلة', 'سيدي خليفة', 'عين التين']},
-    'chelghoum': {'name': 'مركز شلغوم العيد', 'communes': ['شلغوم العيد']},
-    'tadjenanet': {'name': 'مركز تاجنانت', 'communes': ['تاجنانت', 'المشيرة', 'واد خلوف']},
-    'teleghma': {'name': 'مركز التلاغمة', 'communes': ['التلاغمة', 'واد سقان']},
-    'grarem': {'name': 'مركز القرارم قوقة', 'communes': ['القرارم قوقة', 'حمالة']},
-    'ouedendja': {'name': 'مركز وادي انجاء', 'communes': ['واد انجاء', 'احمد راشدي']},
-    'sidimerouane': {'name': 'مركز سيدي مروان', 'communes': ['سيدي مروان', 'الشيقارة']},
-    'terraibainen': {'name': 'مركز ترعي باينان', 'communes': ['ترعي باينان', 'تسالة لمطاعي']}
-}
-
 COMPLAINT_TYPES = ['type_leak', 'type_clog', 'type_smell', 'type_cut', 'type_other']
 COMPLAINT_STATUSES = ['جديد', 'قيد المعالجة', 'حل']
 
+# مولد أرقام التتبع (فريد لكل عامل دون استعلام قاعدة البيانات)
+tracking_ids = TrackingIdGenerator()
+# يصل إليه post_fork في server.py عبر التطبيق نفسه (انظر make_post_fork)
+app.extensions['tracking_ids'] = tracking_ids
+
 # منع التخزين المؤقت (Cache) وإضافة رؤوس الأمان
 @app.after_request
 def add_security_headers(response):
     """إضافة رؤوس أمان مشددة وتعطيل التخزين المؤقت"""
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    # الاستجابات العامة التي حددت سياسة تخزينها بنفسها (/api/centers، التتبع) تُترك كما هي؛
+    # أما صفحات المستخدمين المسجلين وكل ما عداها فلا تُخزن أبداً
+    if 'Cache-Control' not in response.headers or \
+            (not response.cache_control.public and current_user.is_authenticated):
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'SAMEORIGIN'
     response.headers['X-XSS-Protection'] = '1; mode=block'
@@ -128,30 +239,25 @@ def add_security_headers(response):
     response.headers['Content-Security-Policy'] = "default-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com https://fonts.gstatic.com; img-src 'self' data: https://ona-dz.dz;"
     return response
 
+# يُسجل بعد add_security_headers لكي تُطبق سياسة تخزين static قبلها
+assets = StaticAssets(app, cache_dir=os.path.join(INSTANCE_DIR, 'jinja_cache'))
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-def get_center_by_commune(commune):
-    """البحث عن المركز بناءً على البلدية"""
-    for center_id, center_data in ONA_CENTERS.items():
-        if commune in center_data['communes']:
-            return center_id
-    return None
-
 def log_audit(action, entity_type, entity_id=None, changes=None):
-    """تسجيل عملية تدقيق"""
+    """تسجيل عملية تدقيق (تُكتب على دفعات في الخلفية)"""
     try:
-        log = AuditLog(
+        audit_writer.enqueue(
             user_id=current_user.id if current_user.is_authenticated else None,
             action=action,
             entity_type=entity_type,
             entity_id=entity_id,
             changes=json.dumps(changes) if changes else None,
-            ip_address=request.remote_addr
+            ip_address=request.remote_addr,
+            timestamp=datetime.utcnow()
         )
-        db.session.add(log)
-        db.session.commit()
     except Exception as e:
         print(f"خطأ في تسجيل التدقيق: {e}")
 
@@ -176,8 +282,7 @@ def index():
 @app.route('/submit')
 def citizen_form():
     """صفحة تقديم الشكاوى للمواطنين"""
-    communes = sorted([c for center in ONA_CENTERS.values() for c in center['communes']])
-    return render_template('index.html', communes=communes, complaint_types=COMPLAINT_TYPES)
+    return render_template('index.html', communes=ALL_COMMUNES, complaint_types=COMPLAINT_TYPES)
 
 def validate_input(data):
     """تحقق صارم من المدخلات"""
@@ -202,6 +307,82 @@ def validate_input(data):
     
     return None
 
+COMPLAINT_REQUIRED_FIELDS = ['name', 'phone', 'id_card', 'birth_date', 'birth_place', 'address', 'commune', 'type', 'problem']
+
+def prepare_complaint(data):
+    """التحقق من بيانات شكوى وإنشاؤها مشفرة (دون حفظ)؛ يرجع (الشكوى، رسالة الخطأ)"""
+    # التحقق من البيانات
+    if not isinstance(data, dict) or not all(field in data for field in COMPLAINT_REQUIRED_FIELDS):
+        return None, 'بيانات ناقصة'
+    if not all(isinstance(data[field], str) for field in COMPLAINT_REQUIRED_FIELDS):
+        return None, 'بيانات غير صالحة'
+    
+    # تحقق أمني إضافي
+    validation_error = validate_input(data)
+    if validation_error:
+        return None, validation_error
+    
+    # البحث عن المركز
+    center_id = get_center_by_commune(data['commune'])
+    if not center_id:
+        return None, 'بلدية غير صحيحة'
+    
+    # إنشاء الشكوى مع تشفير البيانات
+    complaint = Complaint(
+        commune=data['commune'],
+        complaint_type=data['type'],
+        problem_description=data['problem'],
+        center_id=center_id,
+        status='جديد'
+    )
+    complaint.encrypt_data(
+        name=data['name'],
+        phone=data['phone'],
+        id_card=data.get('id_card'),
+        birth_date=data.get('birth_date'),
+        birth_place=data.get('birth_place'),
+        address=data.get('address')
+    )
+    return complaint, None
+
+def save_complaints(complaints):
+    """حفظ الشكاوى في معاملة واحدة مع توليد أرقام التتبع.
+    يرجع بيانات الشكاوى المحفوظة (FEED_COLUMNS) كما قُرئت قبل commit: القراءة بعده تعيد تحميل كل شكوى باستعلام"""
+    # رقم التتبع فريد بالتصميم؛ إعادة المحاولة احتياط نادر لتصادم رقم العامل
+    for attempt in range(3):
+        for complaint in complaints:
+            complaint.tracking_id = tracking_ids.generate(ONA_CENTERS[complaint.center_id]['code'])
+        db.session.add_all(complaints)
+        try:
+            db.session.flush()
+            saved = [feed_payload(complaint) for complaint in complaints]
+            previous_marker = status_counters.marker_excluding([payload['id'] for payload in saved])
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == 2:
+                raise
+    status_counters.record_new([(payload['center_id'], payload['status']) for payload in saved],
+                               max(payload['updated_at'] for payload in saved), previous_marker)
+    for payload in saved:
+        status_events.publish(payload)
+    return saved
+
+SUBMISSION_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_\-]{8,64}$')
+
+def replay_submission(submission_key):
+    """الرد المحفوظ لشكوى أُرسلت سابقاً بنفس مفتاح منع التكرار، أو None"""
+    tracking_id = db.session.query(Complaint.tracking_id).filter_by(submission_key=submission_key).scalar()
+    if tracking_id is None:
+        return None
+    return jsonify({
+        'status': 'success',
+        'message': 'تم استقبال شكواك بنجاح',
+        'tracking_id': tracking_id,
+        'replayed': True
+    }), 200
+
 @app.route('/api/submit_complaint', methods=['POST'])
 @limiter.limit("5 per minute")
 def submit_complaint():
@@ -209,47 +390,32 @@ def submit_complaint():
     try:
         data = request.get_json()
         
-        # التحقق من البيانات
-        required_fields = ['name', 'phone', 'id_card', 'birth_date', 'birth_place', 'address', 'commune', 'type', 'problem']
-        if not all(field in data for field in required_fields):
-            return jsonify({'status': 'error', 'message': 'بيانات ناقصة'}), 400
+        # إعادة إرسال من طابور التطبيق بعد ضياع الرد: نفس رقم التتبع دون شكوى جديدة
+        submission_key = request.headers.get('Idempotency-Key', '').strip() or None
+        if submission_key:
+            if not SUBMISSION_KEY_PATTERN.match(submission_key):
+                return jsonify({'status': 'error', 'message': 'مفتاح منع التكرار غير صالح'}), 400
+            replay = replay_submission(submission_key)
+            if replay:
+                return replay
         
-        # تحقق أمني إضافي
-        validation_error = validate_input(data)
-        if validation_error:
-            return jsonify({'status': 'error', 'message': validation_error}), 400
-        
-        # البحث عن المركز
-        center_id = get_center_by_commune(data['commune'])
-        if not center_id:
-            return jsonify({'status': 'error', 'message': 'بلدية غير صحيحة'}), 400
-        
-        # إنشاء رقم تتبع
-        tracking_id = f"ONA-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        # إنشاء الشكوى مع تشفير البيانات
-        complaint = Complaint(
-            tracking_id=tracking_id,
-            commune=data['commune'],
-            complaint_type=data['type'],
-            problem_description=data['problem'],
-            center_id=center_id,
-            status='جديد'
-        )
-        complaint.encrypt_data(
-            name=data['name'],
-            phone=data['phone'],
-            id_card=data.get('id_card'),
-            birth_date=data.get('birth_date'),
-            birth_place=data.get('birth_place'),
-            address=data.get('address')
-        )
+        complaint, error = prepare_complaint(data)
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 400
+        complaint.submission_key = submission_key
         
-        db.session.add(complaint)
-        db.session.commit()
+        try:
+            saved, = save_complaints([complaint])
+        except IntegrityError:
+            # إعادة إرسال متزامنة بنفس المفتاح سبقت هذا الطلب
+            replay = replay_submission(submission_key) if submission_key else None
+            if replay:
+                return replay
+            raise
+        tracking_id = saved['tracking_id']
         
         # تسجيل في سجل التدقيق
-        log_audit('شكوى جديدة', 'complaint', complaint.id, {
+        log_audit('شكوى جديدة', 'complaint', saved['id'], {
             'commune': data['commune'],
             'type': data['type']
         })
@@ -263,6 +429,70 @@ def submit_complaint():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def read_bulk_items():
+    """قراءة قائمة الشكاوى من JSON (قائمة أو {"complaints": [...]}) أو NDJSON.
+    السطر غير الصالح في NDJSON يصبح None ليُرفض وحده"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('complaints')
+    return data if isinstance(data, list) else None
+
+@app.route('/api/bulk/complaints', methods=['POST'])
+@login_required
+@limiter.limit("30 per minute")
+def bulk_submit_complaints():
+    """إدخال شكاوى بالجملة (مركز الاتصال والأكشاك): تحقق مسبق، معاملة واحدة، وسجل تدقيق واحد"""
+    try:
+        items = read_bulk_items()
+        if items is None:
+            return jsonify({'status': 'error', 'message': 'بيانات غير صالحة'}), 400
+        if len(items) > app.config['BULK_MAX_ITEMS']:
+            return jsonify({'status': 'error', 'message': f"الحد الأقصى {app.config['BULK_MAX_ITEMS']} شكوى في الطلب"}), 413
+        
+        results = []
+        accepted = []
+        for index, data in enumerate(items):
+            try:
+                complaint, error = prepare_complaint(data)
+            except Exception as e:
+                complaint, error = None, str(e)
+            if error:
+                results.append({'index': index, 'status': 'error', 'message': error})
+            else:
+                accepted.append((index, complaint))
+        
+        if accepted:
+            saved = save_complaints([complaint for _, complaint in accepted])
+            for (index, _), payload in zip(accepted, saved):
+                results.append({'index': index, 'status': 'success', 'tracking_id': payload['tracking_id']})
+            results.sort(key=lambda result: result['index'])
+            
+            log_audit('إدخال شكاوى بالجملة', 'complaint', None, {
+                'count': len(accepted),
+                'failed': len(items) - len(accepted),
+                'ids': [payload['id'] for payload in saved]
+            })
+        
+        return jsonify({
+            'status': 'success' if accepted else 'error',
+            'created': len(accepted),
+            'failed': len(items) - len(accepted),
+            'results': results
+        }), 200 if accepted or not items else 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/login', methods=['GET', 'POST'])
 @limiter.limit("10 per hour")
 def login():
@@ -309,34 +539,89 @@ def dashboard():
     else:
         return redirect(url_for('center_dashboard', center_id=current_user.center_id))
 
+PHONE_QUERY = re.compile(r'^(\+213|00213|0)?[5-7][0-9]{8}$')
+
+def citizen_conditions(phone=None, id_card=None, name=None):
+    """شروط البحث عن مواطن بالفهارس العمياء (مساواة على أعمدة مفهرسة، دون فك تشفير)"""
+    conditions = []
+    if phone:
+        conditions.append(Complaint.phone_bidx == blind_index(normalize_phone(phone)))
+    if id_card:
+        conditions.append(Complaint.id_card_bidx == blind_index(normalize_id_card(id_card)))
+    if name:
+        tokens = [blind_index(token) for token in name_tokens(name)]
+        if tokens:
+            # الشكاوى التي يحتوي اسمها على كل الكلمات المطلوبة
+            matching_ids = db.session.query(ComplaintNameToken.complaint_id) \
+                .filter(ComplaintNameToken.token_bidx.in_(tokens)) \
+                .group_by(ComplaintNameToken.complaint_id) \
+                .having(db.func.count(db.distinct(ComplaintNameToken.token_bidx)) == len(tokens))
+            conditions.append(Complaint.id.in_(matching_ids))
+    return conditions
+
+def apply_admin_search(query, search_query):
+    """بحث الإدارة: رقم هاتف أو رقم تعريف عبر الفهارس العمياء، وإلا بحث نصي كامل أو بالاسم"""
+    compact = re.sub(r'[\s\-]', '', search_query)
+    if PHONE_QUERY.match(compact):
+        return query.filter(*citizen_conditions(phone=compact))
+    conditions = []
+    text_condition = search_index.condition(search_query)
+    if text_condition is not None:
+        conditions.append(text_condition)
+    if compact.isdigit():
+        if len(compact) >= 5:
+            conditions += citizen_conditions(id_card=compact)
+    else:
+        conditions += citizen_conditions(name=search_query)
+    return query.filter(or_(*conditions)) if conditions else query
+
+def serialize_complaint_summary(complaint):
+    """بيانات الشكوى المعروضة في القوائم (بدون بيانات شخصية)"""
+    return {
+        'id': complaint.id,
+        'tracking_id': complaint.tracking_id,
+        'commune': complaint.commune,
+        'type': complaint.complaint_type,
+        'status': complaint.status,
+        'center_id': complaint.center_id,
+        'assigned_to': complaint.assigned_to,
+        'created_at': complaint.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': complaint.updated_at.strftime('%Y-%m-%d %H:%M:%S') if complaint.updated_at else None
+    }
+
+def approx_total(stats, status_filter):
+    """العدد التقريبي للقائمة من عدادات الحالات بدلاً من COUNT(*)"""
+    if status_filter:
+        return stats.get(STATUS_KEYS.get(status_filter))
+    return stats['total']
+
 @app.route('/admin')
 @require_role('admin')
 def admin_dashboard():
     """لوحة التحكم الإدارية - عرض جميع الشكاوى"""
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', '', type=str)
+    before = request.args.get('before', '', type=str)
     search_query = request.args.get('search', '', type=str)
     status_filter = request.args.get('status', '', type=str)
     
     query = Complaint.query
     
     if search_query:
-        query = query.filter(
-            (Complaint.tracking_id.contains(search_query)) |
-            (Complaint.commune.contains(search_query))
-        )
+        query = apply_admin_search(query, search_query)
     
-    if status_filter and status_filter in COMPLAINT_STATUSES:
+    if status_filter not in COMPLAINT_STATUSES:
+        status_filter = ''
+    if status_filter:
         query = query.filter_by(status=status_filter)
     
-    complaints = query.order_by(Complaint.created_at.desc()).paginate(page=page, per_page=20)
-    
     # إحصائيات
-    stats = {
-        'total': Complaint.query.count(),
-        'new': Complaint.query.filter_by(status='جديد').count(),
-        'in_progress': Complaint.query.filter_by(status='قيد المعالجة').count(),
-        'resolved': Complaint.query.filter_by(status='حل').count()
-    }
+    stats = status_counters.snapshot()
+    
+    complaints = keyset_paginate(query, Complaint.created_at, Complaint.id, after, before, per_page=20,
+                                 total=None if search_query else approx_total(stats, status_filter))
+    
+    if request.args.get('format') == 'json':
+        return jsonify({'status': 'success', 'stats': stats, **complaints.to_dict(serialize_complaint_summary)})
     
     return render_template('admin_dashboard.html', 
                           complaints=complaints, 
@@ -345,6 +630,45 @@ def admin_dashboard():
                           search_query=search_query,
                           status_filter=status_filter)
 
+@app.route('/api/admin/search')
+@require_role('admin')
+def search_complaints():
+    """بحث نصي مرتب حسب الصلة في الشكاوى"""
+    search_query = request.args.get('q', '', type=str).strip()
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    results = search_index.search(search_query, limit=limit)
+    return jsonify({
+        'status': 'success',
+        'items': [dict(serialize_complaint_summary(complaint), rank=rank) for complaint, rank in results]
+    })
+
+@app.route('/api/citizen/complaints')
+@login_required
+def citizen_complaints():
+    """سجل شكاوى مواطن حسب الهاتف و/أو رقم التعريف و/أو الاسم"""
+    phone = request.args.get('phone', '', type=str).strip()
+    id_card = request.args.get('id_card', '', type=str).strip()
+    name = request.args.get('name', '', type=str).strip()
+    conditions = citizen_conditions(phone, id_card, name)
+    if not conditions:
+        return jsonify({'status': 'error', 'message': 'يجب تحديد الهاتف أو رقم التعريف أو الاسم'}), 400
+    
+    query = Complaint.query.filter(*conditions)
+    # مدير المركز يرى شكاوى مركزه فقط
+    if current_user.role != 'admin':
+        query = query.filter_by(center_id=current_user.center_id)
+    complaints = query.order_by(Complaint.created_at.desc()).limit(200).all()
+    
+    log_audit('بحث عن سجل مواطن', 'complaint', None, {
+        'fields': [field for field, value in (('phone', phone), ('id_card', id_card), ('name', name)) if value],
+        'results': len(complaints)
+    })
+    
+    return jsonify({
+        'status': 'success',
+        'items': [serialize_complaint_summary(complaint) for complaint in complaints]
+    })
+
 @app.route('/center/<center_id>')
 @login_required
 def center_dashboard(center_id):
@@ -357,23 +681,25 @@ def center_dashboard(center_id):
         flash('مركز غير موجود', 'danger')
         return redirect(url_for('dashboard'))
     
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', '', type=str)
+    before = request.args.get('before', '', type=str)
     status_filter = request.args.get('status', '', type=str)
     
     query = Complaint.query.filter_by(center_id=center_id)
     
-    if status_filter and status_filter in COMPLAINT_STATUSES:
+    if status_filter not in COMPLAINT_STATUSES:
+        status_filter = ''
+    if status_filter:
         query = query.filter_by(status=status_filter)
     
-    complaints = query.order_by(Complaint.created_at.desc()).paginate(page=page, per_page=20)
-    
     # إحصائيات المركز
-    stats = {
-        'total': Complaint.query.filter_by(center_id=center_id).count(),
-        'new': Complaint.query.filter_by(center_id=center_id, status='جديد').count(),
-        'in_progress': Complaint.query.filter_by(center_id=center_id, status='قيد المعالجة').count(),
-        'resolved': Complaint.query.filter_by(center_id=center_id, status='حل').count()
-    }
+    stats = status_counters.snapshot(center_id)
+    
+    complaints = keyset_paginate(query, Complaint.created_at, Complaint.id, after, before, per_page=20,
+                                 total=approx_total(stats, status_filter))
+    
+    if request.args.get('format') == 'json':
+        return jsonify({'status': 'success', 'stats': stats, **complaints.to_dict(serialize_complaint_summary)})
     
     return render_template('center_dashboard.html',
                           complaints=complaints,
@@ -382,10 +708,137 @@ def center_dashboard(center_id):
                           center_name=ONA_CENTERS[center_id]['name'],
                           status_filter=status_filter)
 
+@app.route('/api/export/complaints')
+@login_required
+@limiter.limit("10 per hour")
+def export_complaints():
+    """تصدير الشكاوى (CSV أو XLSX) بتدفق: الذاكرة ثابتة مهما كان عدد الصفوف"""
+    export_format = request.args.get('format', 'csv', type=str)
+    columns = parse_columns(request.args.get('columns', '', type=str))
+    if export_format not in ('csv', 'xlsx') or columns is None:
+        return jsonify({'status': 'error', 'message': 'صيغة أو أعمدة غير صالحة'}), 400
+    if export_format == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return jsonify({'status': 'error', 'message': 'تصدير Excel غير متاح (openpyxl غير مثبت)'}), 400
+    
+    center_id = request.args.get('center', '', type=str)
+    # مدير المركز يصدر شكاوى مركزه فقط
+    if current_user.role != 'admin':
+        center_id = current_user.center_id
+    try:
+        date_from = parse_date(request.args.get('from', '', type=str))
+        date_to = parse_date(request.args.get('to', '', type=str), end=True)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'صيغة التاريخ يجب أن تكون YYYY-MM-DD'}), 400
+    
+    filters = {
+        'center_id': center_id,
+        'status': request.args.get('status', '', type=str),
+        'commune': request.args.get('commune', '', type=str),
+        'complaint_type': request.args.get('type', '', type=str),
+        'date_from': date_from,
+        'date_to': date_to
+    }
+    statement = export_statement(Complaint, columns, **filters)
+    log_audit('تصدير شكاوى', 'complaint', None, {
+        'format': export_format,
+        'columns': columns,
+        'filters': {key: str(value) for key, value in filters.items() if value}
+    })
+    
+    chunks = iter_export_chunks(db.session, statement, columns, cipher)
+    filename = f"complaints_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    if export_format == 'xlsx':
+        body = iter_xlsx(chunks, columns)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = iter_csv(chunks, columns)
+        mimetype = 'text/csv'
+    response = app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 def get_t(key):
     lang = session.get('lang', 'ar')
     return TRANSLATIONS.get(lang, TRANSLATIONS['ar']).get(key, key)
 
+TRACKING_COLUMNS = (Complaint.id, Complaint.tracking_id, Complaint.status, Complaint.complaint_type,
+                    Complaint.commune, Complaint.created_at, Complaint.updated_at)
+
+def tracking_payloads(tracking_ids):
+    """بيانات التتبع العامة لعدة شكاوى: من الذاكرة المؤقتة، والباقي باستعلام IN واحد على الأعمدة اللازمة فقط.
+    يرجع قاموس {الرقم كما أُرسل: البيانات أو None}"""
+    # حرف التحقق يرفض الأرقام الخاطئة دون استعلام
+    normalized = {tracking_id: normalize_tracking_id(tracking_id) for tracking_id in tracking_ids}
+    found = {}
+    missing = []
+    for normalized_id in set(filter(None, normalized.values())):
+        payload = tracking_cache.get(normalized_id)
+        if payload is None:
+            missing.append(normalized_id)
+        else:
+            found[normalized_id] = payload
+    if missing:
+        for row in db.session.query(*TRACKING_COLUMNS).filter(Complaint.tracking_id.in_(missing)):
+            payload = row._asdict()
+            tracking_cache.set(row.tracking_id, payload)
+            found[row.tracking_id] = payload
+    return {tracking_id: found.get(normalized_id) for tracking_id, normalized_id in normalized.items()}
+
+def tracking_payload(tracking_id):
+    """بيانات التتبع العامة لشكوى واحدة"""
+    return tracking_payloads([tracking_id])[tracking_id]
+
+def serialize_tracking(payload):
+    """الحقول العامة المرسلة للمواطن"""
+    return {
+        'tracking_id': payload['tracking_id'],
+        'complaint_status': payload['status'],
+        'created_at': payload['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
+        'type': payload['complaint_type'],
+        'commune': payload['commune']
+    }
+
+# أعمدة أحداث التغيير: بيانات التتبع + ما تحتاجه لوحات المراكز
+FEED_COLUMNS = TRACKING_COLUMNS + (Complaint.center_id, Complaint.assigned_to)
+
+def feed_payload(complaint):
+    return {column.key: getattr(complaint, column.key) for column in FEED_COLUMNS}
+
+def tracking_changes(since, limit=None):
+    """الشكاوى المحدثة بعد since (لمراقب الأحداث واستئناف لوحات التحكم)"""
+    query = db.session.query(*FEED_COLUMNS).filter(Complaint.updated_at > since).order_by(Complaint.updated_at)
+    if limit:
+        query = query.limit(limit)
+    return [row._asdict() for row in query]
+
+def feed_topics(payload):
+    """مواضيع التغيير: رقم التتبع (المواطن)، مركزه، وكل المراكز (الإدارة)"""
+    return [payload['tracking_id'], f"center:{payload['center_id']}", 'center:*']
+
+def remote_changes(payloads):
+    # شكاوى أُضيفت أو عُدلت في عامل آخر: العدادات المحلية تُطابق عند القراءة التالية
+    status_counters.expire()
+
+# أحداث تغير الشكاوى للمواطنين المشتركين ولوحات المراكز
+status_events = StatusBroker(app, tracking_changes, topics=feed_topics, on_remote_changes=remote_changes)
+
+def tracking_validators(payload, variant=''):
+    """ETag وLast-Modified مشتقان من updated_at (variant لتمييز اللغة في صفحة HTML)"""
+    last_modified = payload['updated_at'] or payload['created_at']
+    etag = f"{payload['tracking_id']}-{int(last_modified.timestamp() * 1000)}{variant}"
+    return etag, last_modified
+
+def tracking_response(response, etag, last_modified):
+    """تخزين خاص بالمتصفح مع إعادة التحقق في كل طلب (304 إذا لم تتغير الشكوى)"""
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/track', methods=['GET', 'POST'])
 def track_complaint():
     """تتبع حالة الشكوى من قبل المواطن"""
@@ -393,32 +846,228 @@ def track_complaint():
     tracking_id = request.args.get('tracking_id') or request.form.get('tracking_id')
     
     if tracking_id:
-        complaint = Complaint.query.filter_by(tracking_id=tracking_id).first()
+        payload = tracking_payload(tracking_id)
+        if payload:
+            etag, last_modified = tracking_validators(payload, '-' + session.get('lang', 'ar'))
+            # الصفحة لم تتغير منذ آخر زيارة: لا حاجة لتحميل الشكوى ولا لعرض القالب
+            if request.method == 'GET' and not is_resource_modified(request.environ, etag, last_modified=last_modified):
+                return tracking_response(app.response_class(), etag, last_modified)
+            complaint = db.session.get(Complaint, payload['id'])
         if not complaint:
             flash(get_t('error_tracking_not_found'), 'warning')
-            
-    return render_template('track.html', complaint=complaint, tracking_id=tracking_id)
+    
+    html = render_template('track.html', complaint=complaint, tracking_id=tracking_id)
+    if complaint and request.method == 'GET':
+        return tracking_response(app.make_response(html), etag, last_modified)
+    return html
 
 @app.route('/api/track/<tracking_id>', methods=['GET'])
 @limiter.limit("10 per minute")
 def api_track_complaint(tracking_id):
     """تتبع حالة الشكوى (API للموبايل)"""
     try:
-        complaint = Complaint.query.filter_by(tracking_id=tracking_id).first()
-        if not complaint:
+        payload = tracking_payload(tracking_id)
+        if not payload:
             return jsonify({'status': 'error', 'message': 'رقم التتبع غير موجود'}), 404
         
-        return jsonify({
+        etag, last_modified = tracking_validators(payload)
+        return tracking_response(jsonify({'status': 'success', **serialize_tracking(payload)}), etag, last_modified)
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/track/batch', methods=['GET'])
+@limiter.limit("10 per minute")
+def api_track_batch():
+    """تتبع عدة شكاوى في طلب واحد: ?ids=ID1,ID2,... (حتى TRACK_BATCH_MAX رقماً)"""
+    try:
+        tracking_ids = list(dict.fromkeys(
+            tracking_id.strip() for tracking_id in request.args.get('ids', '', type=str).split(',') if tracking_id.strip()
+        ))
+        if not tracking_ids:
+            return jsonify({'status': 'error', 'message': 'لم يتم تحديد أرقام التتبع'}), 400
+        if len(tracking_ids) > app.config['TRACK_BATCH_MAX']:
+            return jsonify({'status': 'error', 'message': f"الحد الأقصى {app.config['TRACK_BATCH_MAX']} رقم تتبع في الطلب"}), 413
+        
+        payloads = tracking_payloads(tracking_ids)
+        response = jsonify({
             'status': 'success',
-            'tracking_id': complaint.tracking_id,
-            'complaint_status': complaint.status,
-            'created_at': complaint.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'type': complaint.complaint_type,
-            'commune': complaint.commune
+            'items': [
+                {'requested_id': tracking_id, 'found': True, **serialize_tracking(payload)} if payload
+                else {'requested_id': tracking_id, 'found': False}
+                for tracking_id, payload in payloads.items()
+            ]
         })
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def streams_busy():
+    """رد 503 عند بلوغ حد قنوات SSE في العامل: العميل يرجع للاستعلام الدوري ثم يعيد المحاولة"""
+    response = jsonify({'status': 'error', 'message': 'الخادم مشغول، أعد المحاولة لاحقاً'})
+    response.headers['Retry-After'] = '30'
+    return response, 503
+
+def sse_event(payload):
+    return f"id: {event_id(payload['updated_at'])}\nevent: status\ndata: {json.dumps(serialize_tracking(payload), ensure_ascii=False)}\n\n"
+
+@app.route('/api/track/stream', methods=['GET'])
+@limiter.limit("10 per minute")
+def api_track_stream():
+    """قناة أحداث (Server-Sent Events) لتغير حالة شكوى أو أكثر: ?ids=ID1,ID2
+    الاستئناف عبر Last-Event-ID: تُرسل فقط الحالات الأحدث منه"""
+    tracking_ids = list(dict.fromkeys(
+        tracking_id.strip() for tracking_id in request.args.get('ids', '', type=str).split(',') if tracking_id.strip()
+    ))
+    if not tracking_ids or len(tracking_ids) > app.config['TRACK_BATCH_MAX']:
+        return jsonify({'status': 'error', 'message': 'أرقام التتبع غير صالحة'}), 400
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+    
+    payloads = [payload for payload in tracking_payloads(tracking_ids).values() if payload]
+    if not payloads:
+        return jsonify({'status': 'error', 'message': 'رقم التتبع غير موجود'}), 404
+    subscription = status_events.subscribe([payload['tracking_id'] for payload in payloads], last_event_id)
+    if subscription is None:
+        return streams_busy()
+    # الحالة الحالية (أو ما فات منذ Last-Event-ID) قبل انتظار التغييرات
+    for payload in payloads:
+        subscription.push(payload['tracking_id'], event_id(payload['updated_at']), payload)
+    
+    heartbeat = app.config['EVENTS_HEARTBEAT']
+    closes_at = time.monotonic() + app.config['EVENTS_MAX_AGE']
+    
+    def stream():
+        # لا سياق طلب ولا اتصال قاعدة بيانات أثناء الانتظار: المشترك الخامل يكلف خيطاً نائماً فقط
+        try:
+            yield f"retry: {heartbeat * 250}\n\n"
+            while time.monotonic() < closes_at:
+                events = subscription.wait(heartbeat)
+                if not events:
+                    yield ": ping\n\n"
+                for _, payload in events:
+                    yield sse_event(payload)
+        finally:
+            status_events.unsubscribe(subscription)
+    
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def dashboard_event(payload):
+    data = serialize_complaint_summary(SimpleNamespace(**payload))
+    return f"id: {event_id(payload['updated_at'])}\nevent: complaint\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stats_event(stats):
+    return f"event: stats\ndata: {json.dumps(stats)}\n\n"
+
+def dashboard_poll_limit():
+    """حد الاستعلام الدوري للوحة التحكم حسب فترته (ضعف العدد المتوقع لتبويبين مفتوحين)"""
+    return f"{int(3600 / app.config['DASHBOARD_POLL_INTERVAL']) * 2} per hour"
+
+@app.route('/api/dashboard/changes', methods=['GET'])
+@login_required
+@limiter.limit(dashboard_poll_limit, key_func=lambda: f"dashboard-poll:{current_user.get_id()}")
+def dashboard_changes():
+    """بديل خفيف لقناة لوحة التحكم حين يرفضها الخادم (503): العدادات وما تغير بعد ?since=
+    (معرف آخر حدث). حده خاص به لكي لا يستهلك حد صفحات لوحة التحكم"""
+    center_id = request.args.get('center', '', type=str)
+    if current_user.role != 'admin':
+        center_id = current_user.center_id
+    if center_id and center_id not in ONA_CENTERS:
+        return jsonify({'status': 'error', 'message': 'مركز غير موجود'}), 400
+    since = request.args.get('since', 0, type=int)
+    
+    items = []
+    if since:
+        for payload in tracking_changes(datetime.fromtimestamp(since / 1000), limit=app.config['DASHBOARD_RESUME_MAX']):
+            if not center_id or payload['center_id'] == center_id:
+                items.append(serialize_complaint_summary(SimpleNamespace(**payload)))
+                since = event_id(payload['updated_at'])
+    else:
+        # أول استعلام: الصفحة معروضة للتو، يكفي معرف آخر تغيير
+        latest = db.session.query(db.func.max(Complaint.updated_at)).scalar()
+        since = event_id(latest) if latest else 0
+    
+    return jsonify({
+        'status': 'success',
+        'stats': status_counters.snapshot(center_id or None),
+        'items': items,
+        'last_event_id': since,
+        'poll_interval': app.config['DASHBOARD_POLL_INTERVAL']
+    })
+
+@app.route('/api/dashboard/stream', methods=['GET'])
+@login_required
+def dashboard_stream():
+    """قناة أحداث لوحة التحكم: الشكاوى الجديدة وتغيرات الحالة للمركز (?center=) مع العدادات المحدثة،
+    بدلاً من إعادة تحميل الصفحة. الاستئناف عبر Last-Event-ID يرسل ما فات من فهرس updated_at"""
+    center_id = request.args.get('center', '', type=str)
+    # مدير المركز يتابع مركزه فقط
+    if current_user.role != 'admin':
+        center_id = current_user.center_id
+    if center_id and center_id not in ONA_CENTERS:
+        return jsonify({'status': 'error', 'message': 'مركز غير موجود'}), 400
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+    
+    subscription = status_events.subscribe([f"center:{center_id or '*'}"], last_event_id)
+    if subscription is None:
+        # dashboard_live.js يرجع إلى الاستعلام الدوري عن /api/dashboard/changes
+        return streams_busy()
+    if last_event_id:
+        # ما تغير أثناء انقطاع الاتصال (محدود: بعد انقطاع طويل يُفضل إعادة تحميل الصفحة)
+        since = datetime.fromtimestamp(last_event_id / 1000)
+        for payload in tracking_changes(since, limit=app.config['DASHBOARD_RESUME_MAX']):
+            if not center_id or payload['center_id'] == center_id:
+                subscription.push(payload['tracking_id'], event_id(payload['updated_at']), payload)
+    stats = status_counters.snapshot(center_id or None)
+    
+    heartbeat = app.config['EVENTS_HEARTBEAT']
+    closes_at = time.monotonic() + app.config['EVENTS_MAX_AGE']
+    
+    def stream():
+        try:
+            yield f"retry: {heartbeat * 250}\n\n"
+            yield stats_event(stats)
+            while time.monotonic() < closes_at:
+                events = subscription.wait(heartbeat)
+                if not events:
+                    yield ": ping\n\n"
+                    continue
+                for _, payload in events:
+                    yield dashboard_event(payload)
+                # عدادات الذاكرة: لا استعلام إلا عند المطابقة الدورية. السياق يُغلق قبل yield:
+                # المولد قد يبقى متوقفاً طويلاً ولا يُترك سياق مفتوحاً أثناء ذلك
+                with app.app_context():
+                    current = status_counters.snapshot(center_id or None)
+                yield stats_event(current)
+        finally:
+            status_events.unsubscribe(subscription)
+    
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/centers', methods=['GET'])
+@limiter.exempt
+def api_centers():
+    """سجل المراكز والبلديات (مورد عام بإصدار وETag وتخزين مؤقت طويل)"""
+    response = app.response_class(CENTERS_JSON, mimetype='application/json')
+    response.set_etag(CENTERS_VERSION)
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response.make_conditional(request)
+
 @app.route('/api/complaint/<complaint_id>', methods=['GET'])
 @login_required
 def get_complaint(complaint_id):
@@ -434,15 +1083,21 @@ def get_complaint(complaint_id):
         
         log_audit('عرض شكوى', 'complaint', complaint.id)
         
+        # فك التشفير مرة واحدة لكل إصدار من الشكوى
+        pii = pii_cache.get(complaint.id, complaint.updated_at)
+        if pii is None:
+            pii = complaint.decrypt_all()
+            pii_cache.set(complaint.id, pii, complaint.updated_at)
+        
         return jsonify({
             'id': complaint.id,
             'tracking_id': complaint.tracking_id,
-            'name': complaint.decrypt_name(),
-            'phone': complaint.decrypt_phone(),
-            'id_card': complaint.decrypt_id_card(),
-            'birth_date': complaint.decrypt_birth_date(),
-            'birth_place': complaint.decrypt_birth_place(),
-            'address': complaint.decrypt_address(),
+            'name': pii['name'],
+            'phone': pii['phone'],
+            'id_card': pii['id_card'],
+            'birth_date': pii['birth_date'],
+            'birth_place': pii['birth_place'],
+            'address': pii['address'],
             'commune': complaint.commune,
             'type': complaint.complaint_type,
             'problem': complaint.problem_description,
@@ -483,7 +1138,14 @@ def update_complaint(complaint_id):
         if new_status == 'حل':
             complaint.resolved_at = datetime.utcnow()
         
+        db.session.flush()
+        written_at = complaint.updated_at
+        previous_marker = status_counters.marker_excluding([complaint.id])
         db.session.commit()
+        status_counters.record_transition(complaint.center_id, old_status, new_status, written_at, previous_marker)
+        pii_cache.invalidate(complaint.id)
+        tracking_cache.invalidate(complaint.tracking_id)
+        status_events.publish(feed_payload(complaint))
         
         log_audit('تحديث شكوى', 'complaint', complaint.id, {
             'old_status': old_status,
@@ -497,15 +1159,82 @@ def update_complaint(complaint_id):
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def serialize_audit_log(log):
+    return {
+        'id': log.id,
+        'user_id': log.user_id,
+        'action': log.action,
+        'entity_type': log.entity_type,
+        'entity_id': log.entity_id,
+        'changes': log.changes,
+        'ip_address': log.ip_address,
+        'timestamp': log.timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
 @app.route('/api/audit-logs')
 @require_role('admin')
 def get_audit_logs():
     """الحصول على سجلات التدقيق"""
-    page = request.args.get('page', 1, type=int)
-    logs = AuditLog.query.order_by(AuditLog.timestamp.desc()).paginate(page=page, per_page=50)
+    after = request.args.get('after', '', type=str)
+    before = request.args.get('before', '', type=str)
+    # كتابة الأحداث المنتظرة حتى يظهر آخر نشاط في الصفحة
+    audit_writer.flush()
+    # السجل يُضاف إليه فقط، فأكبر معرف تقدير كافٍ للعدد دون COUNT(*)
+    total = db.session.query(db.func.max(AuditLog.id)).scalar() or 0
+    logs = keyset_paginate(AuditLog.query, AuditLog.timestamp, AuditLog.id, after, before, per_page=50, total=total)
+    
+    if request.args.get('format') == 'json':
+        return jsonify({'status': 'success', **logs.to_dict(serialize_audit_log)})
     
     return render_template('audit_logs.html', logs=logs)
 
+def metrics_authorized():
+    """Prometheus يرسل METRICS_TOKEN (Bearer)؛ المدير المسجل يمكنه الفتح من المتصفح"""
+    token = app.config['METRICS_TOKEN']
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if token and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip(), token):
+        return True
+    return current_user.is_authenticated and current_user.role == 'admin'
+
+@app.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    """قياسات الأداء لكل العمال مجتمعة بصيغة Prometheus"""
+    if not metrics_authorized():
+        response = app.response_class('Unauthorized\n', status=401, mimetype='text/plain')
+        response.headers['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/slow-queries')
+@require_role('admin')
+def slow_queries_report():
+    """أكثر الاستعلامات البطيئة كلفة مع خطة تنفيذها (يتطلب SLOW_QUERY_MS)"""
+    sort = request.args.get('sort', 'total_ms', type=str)
+    if sort not in ('total_ms', 'max_ms', 'count'):
+        return jsonify({'status': 'error', 'message': 'ترتيب غير صالح'}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    return jsonify({
+        'status': 'success',
+        'enabled': slow_queries.enabled,
+        'threshold_ms': slow_queries.threshold_ms,
+        'items': slow_queries.top(limit, sort)
+    })
+
+@app.route('/api/admin/runtime-stats')
+@require_role('admin')
+def runtime_stats():
+    """حالة المكونات الداخلية (طابور التدقيق...)"""
+    return jsonify({
+        'audit': audit_writer.stats(),
+        'status_counters': status_counters.stats(),
+        'storage': storage_report(db),
+        'pii_cache': pii_cache.stats(),
+        'tracking_cache': tracking_cache.stats(),
+        'compression': compressor.stats(),
+        'status_events': status_events.stats()
+    })
+
 @app.route('/admin/users')
 @require_role('admin')
 def manage_users():
@@ -612,14 +1341,12 @@ def internal_error(e):
     db.session.rollback()
     return render_template('500.html'), 500
 
-def open_browser():
-    """فتح المتصفح بعد قليل من الوقت لضمان عمل السرفر"""
-    webbrowser.open_new("http://127.0.0.1:5000")
-
-if __name__ == '__main__':
-    # تهيئة قاعدة البيانات والتأكد من وجود المستخدمين
+def init_database():
+    """تهيئة قاعدة البيانات والتأكد من وجود المستخدمين"""
     with app.app_context():
         db.create_all()
+        upgrade_schema(db)
+        search_index.ensure_index()
         if User.query.filter_by(username='admin').first() is None:
             admin = User(username='admin', email='admin@ona.dz', role='admin')
             admin.set_password('admin123')
@@ -638,6 +1365,82 @@ if __name__ == '__main__':
                 db.session.add(center_user)
         
         db.session.commit()
+        print_storage_report(db)
+
+def plain_value(value):
+    """القيمة المفكوكة أو None إذا كانت فارغة أو تعذر فك تشفيرها"""
+    return None if value in ('-', '***مشفر***') else value
+
+def backfill_blind_indexes(chunk_size=500):
+    """حساب الفهارس العمياء للشكاوى القديمة على دفعات (الذاكرة ثابتة مهما كان عدد الصفوف)"""
+    total = 0
+    last_id = 0
+    while True:
+        complaints = Complaint.query \
+            .filter(Complaint.id > last_id, Complaint.phone_bidx.is_(None)) \
+            .order_by(Complaint.id).limit(chunk_size).all()
+        if not complaints:
+            break
+        for complaint in complaints:
+            pii = complaint.decrypt_all()
+            phone = plain_value(pii['phone'])
+            if phone is None:
+                # لا يمكن فك التشفير (مفتاح مختلف)، نتجاوز الصف
+                continue
+            complaint.phone_bidx = blind_index(normalize_phone(phone))
+            complaint.id_card_bidx = blind_index(normalize_id_card(plain_value(pii['id_card'])))
+            name = plain_value(pii['name'])
+            if name and BLIND_INDEX_NAMES:
+                complaint.name_tokens = [ComplaintNameToken(token_bidx=blind_index(token)) for token in name_tokens(name)]
+        db.session.commit()
+        total += len(complaints)
+        last_id = complaints[-1].id
+        db.session.expunge_all()
+        print(f"تمت معالجة {total} شكوى")
+    return total
+
+@app.cli.command('backfill-blind-index')
+@click.option('--chunk-size', default=500, help='عدد الشكاوى في كل دفعة')
+def backfill_blind_index_command(chunk_size):
+    """ملء الفهارس العمياء (الهاتف، رقم التعريف، الاسم) للشكاوى القديمة"""
+    upgrade_schema(db)
+    backfill_blind_indexes(chunk_size)
+
+@app.cli.command('export-complaints')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--center', default='', help='معرف المركز')
+@click.option('--status', default='', help='حالة الشكوى')
+@click.option('--commune', default='', help='البلدية')
+@click.option('--type', 'complaint_type', default='', help='نوع الشكوى')
+@click.option('--from', 'date_from', default='', help='من تاريخ (YYYY-MM-DD)')
+@click.option('--to', 'date_to', default='', help='إلى تاريخ (YYYY-MM-DD)')
+@click.option('--columns', default='', help='الأعمدة مفصولة بفواصل')
+def export_complaints_command(output, center, status, commune, complaint_type, date_from, date_to, columns):
+    """تصدير الشكاوى إلى ملف CSV أو XLSX (حسب امتداد الملف)"""
+    selected = parse_columns(columns)
+    if selected is None:
+        raise click.BadParameter('أعمدة غير معروفة', param_hint='--columns')
+    statement = export_statement(Complaint, selected, center_id=center, status=status, commune=commune,
+                                 complaint_type=complaint_type, date_from=parse_date(date_from),
+                                 date_to=parse_date(date_to, end=True))
+    chunks = iter_export_chunks(db.session, statement, selected, cipher)
+    if output.lower().endswith('.xlsx'):
+        with open(output, 'wb') as file:
+            write_xlsx(chunks, selected, file)
+    else:
+        with open(output, 'w', encoding='utf-8', newline='') as file:
+            for part in iter_csv(chunks, selected):
+                file.write(part)
+    print(f"تم التصدير إلى {output}")
+
+def open_browser():
+    """فتح المتصفح بعد قليل من الوقت لضمان عمل السرفر"""
+    webbrowser.open_new("http://127.0.0.1:5000")
+
+if __name__ == '__main__':
+    from server import serve
+    
+    init_database()
 
     print("\n" + "="*50)
     print("Application ONAMob is running on Desktop Mode")
@@ -650,5 +1453,6 @@ if __name__ == '__main__':
     # فتح المتصفح تلقائياً في خيط منفصل
     threading.Timer(1.5, open_browser).start()
 
-    # التشغيل العادي مع تعطيل الـ debug عند التشغيل كـ EXE
-    app.run(debug=not is_exe, host='127.0.0.1', port=5000)
+    # الوضع الخفيف افتراضياً مع تعطيل الـ debug عند التشغيل كـ EXE
+    # (ONA_SERVER_MODE=production لتشغيل خادم الإنتاج متعدد العمليات)
+    serve(app, os.environ.get('ONA_SERVER_MODE', 'desktop'), debug=not is_exe)
@@ -0,0 +1,67 @@
+import os
+import hashlib
+import threading
+from flask import request
+from jinja2 import FileSystemBytecodeCache
+
+# سنة كاملة: الرابط يتغير مع محتوى الملف، فلا حاجة لإعادة التحقق
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class StaticAssets:
+    """وضع الإنتاج: روابط ملفات static ببصمة المحتوى (?v=) مع تخزين دائم في المتصفح،
+    وقوالب Jinja مخزنة في الذاكرة ومترجمة مسبقاً في instance/. في وضع التطوير لا يتغير شيء"""
+
+    def __init__(self, app=None, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._hashes = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if not app.config.get('ASSET_CACHING'):
+            # التطوير: القوالب والملفات تُقرأ من جديد في كل طلب
+            app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+            app.jinja_env.cache = None
+            return
+
+        app.jinja_env.auto_reload = False
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(self.cache_dir)
+        app.url_defaults(self.add_fingerprint)
+        app.after_request(self.cache_static)
+
+    def fingerprint(self, filename):
+        """بصمة محتوى الملف (تُحسب مرة واحدة لكل ملف)"""
+        with self._lock:
+            if filename in self._hashes:
+                return self._hashes[filename]
+        path = os.path.join(self.app.static_folder, filename)
+        try:
+            with open(path, 'rb') as file:
+                digest = hashlib.sha256(file.read()).hexdigest()[:12]
+        except OSError:
+            digest = None
+        with self._lock:
+            self._hashes[filename] = digest
+        return digest
+
+    def add_fingerprint(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = self.fingerprint(values['filename'])
+            if digest:
+                values['v'] = digest
+
+    def cache_static(self, response):
+        # فقط الروابط التي تحمل البصمة الصحيحة تُخزن لمدة سنة
+        if request.endpoint == 'static' and response.status_code in (200, 304):
+            version = request.args.get('v')
+            if version and version == self.fingerprint(request.view_args.get('filename', '')):
+                response.cache_control.public = True
+                response.cache_control.max_age = IMMUTABLE_MAX_AGE
+                response.cache_control.immutable = True
+                response.cache_control.no_cache = None
+        return response
@@ -0,0 +1,176 @@
+import os
+import time
+import queue
+import atexit
+import threading
+
+
+class AuditWriter:
+    """كاتب سجل التدقيق غير المتزامن: يجمع الأحداث في طابور ويكتبها على دفعات"""
+
+    def __init__(self, app=None, db=None, table=None):
+        self.app = None
+        self.db = None
+        self.table = None
+        self.batch_size = 100
+        self.flush_interval = 1.0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopping = False
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+        if app is not None:
+            self.init_app(app, db, table)
+
+    def init_app(self, app, db, table):
+        """ربط الكاتب بالتطبيق وقاعدة البيانات"""
+        self.app = app
+        self.db = db
+        self.table = table
+        self.batch_size = max(1, app.config.get('AUDIT_BATCH_SIZE', 100))
+        self.flush_interval = max(0.05, app.config.get('AUDIT_FLUSH_INTERVAL', 1.0))
+        self._max_queue = app.config.get('AUDIT_MAX_QUEUE', 10000)
+        atexit.register(self.stop)
+
+    def _ensure_started(self):
+        """تشغيل خيط الكتابة عند أول استعمال (ومن جديد بعد fork في كل عامل)"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self._max_queue)
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, **event):
+        """إضافة حدث تدقيق إلى الطابور (يحجب فقط إذا امتلأ الطابور)"""
+        self._ensure_started()
+        self._queue.put(event)
+        self._stats['enqueued'] += 1
+
+    def _drain(self, first):
+        """سحب دفعة من الطابور في حدود الحجم والمهلة"""
+        batch, waiters = [], []
+        item = first
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is None:
+                self._stopping = True
+                break
+            if isinstance(item, threading.Event):
+                # طلب تفريغ فوري: نكتب الدفعة الحالية دون انتظار المهلة
+                waiters.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch, waiters
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, waiters = self._drain(first)
+            self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+        # تفريغ ما تبقى قبل الخروج
+        self._drain_now()
+
+    def _write(self, rows):
+        """كتابة دفعة واحدة بعملية executemany داخل معاملة واحدة"""
+        if not rows:
+            return
+        started = time.perf_counter()
+        with self._write_lock:
+            for attempt in range(3):
+                try:
+                    with self.app.app_context():
+                        with self.db.engine.begin() as conn:
+                            conn.execute(self.table.insert(), rows)
+                    self._stats['written'] += len(rows)
+                    break
+                except Exception as e:
+                    if attempt == 2:
+                        self._stats['failed'] += len(rows)
+                        print(f"خطأ في تسجيل التدقيق: {e}")
+                    else:
+                        time.sleep(0.1 * (attempt + 1))
+        elapsed = (time.perf_counter() - started) * 1000
+        self._stats['batches'] += 1
+        self._stats['last_flush_ms'] = elapsed
+        self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed)
+        self._stats['total_flush_ms'] += elapsed
+
+    def flush(self, timeout=2.0):
+        """كتابة كل الأحداث المنتظرة فوراً وانتظار انتهائها"""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        if self._thread is not None and self._thread.is_alive():
+            waiter = threading.Event()
+            self._queue.put(waiter)
+            waiter.wait(timeout)
+        else:
+            self._drain_now()
+
+    def _drain_now(self):
+        """تفريغ الطابور في الخيط الحالي (عند الإيقاف)"""
+        if self._queue is None:
+            return
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+
+    def stop(self, timeout=5.0):
+        """إيقاف نظيف: إرسال إشارة التوقف وانتظار تفريغ الطابور"""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._drain_now()
+
+    def stats(self):
+        """حالة الطابور وزمن الكتابة"""
+        batches = self._stats['batches']
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'enqueued': self._stats['enqueued'],
+            'written': self._stats['written'],
+            'failed': self._stats['failed'],
+            'batches': batches,
+            'last_flush_ms': round(self._stats['last_flush_ms'], 3),
+            'max_flush_ms': round(self._stats['max_flush_ms'], 3),
+            'avg_flush_ms': round(self._stats['total_flush_ms'] / batches, 3) if batches else 0.0,
+        }
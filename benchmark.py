@@ -0,0 +1,344 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import secrets
+import argparse
+import contextlib
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+import requests
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# خليط الطلبات الافتراضي: الوزن النسبي لكل عملية
+DEFAULT_MIX = 'submit=2,track=5,admin=1,center=2'
+OPERATIONS = ('submit', 'track', 'admin', 'center')
+
+
+def parse_mix(value):
+    """'submit=2,track=5' -> {'submit': 2, 'track': 5}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"عملية غير معروفة: {name}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('خليط فارغ')
+    return mix
+
+
+def percentile(values, p):
+    """النسبة المئوية بطريقة أقرب رتبة (values مرتبة)"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))
+    return round(values[index], 2)
+
+
+def benchmark_env(work_dir, port):
+    """بيئة الخادم المختبر: قاعدة ومحدد سرعة مؤقتان، مفاتيح عشوائية، ومحدد السرعة معطل.
+    القياسات وسجل الاستعلامات البطيئة في work_dir أيضاً: لا تختلط الحركة الاصطناعية بقياسات الخادم الحقيقي"""
+    from cryptography.fernet import Fernet
+    env = dict(os.environ)
+    env.update({
+        'ONA_DB_PATH': os.path.join(work_dir, 'benchmark.db'),
+        'RATELIMIT_ENABLED': 'False',
+        'RATELIMIT_STORAGE_URI': f"sqlite:///{os.path.join(work_dir, 'ratelimit.db')}",
+        'METRICS_DB': os.path.join(work_dir, 'metrics.db'),
+        'SLOW_QUERY_DB': os.path.join(work_dir, 'slow_queries.db'),
+        'SLOW_QUERY_LOG': os.path.join(work_dir, 'slow_queries.log'),
+        'SECRET_KEY': secrets.token_hex(32),
+        'ENCRYPTION_KEY': Fernet.generate_key().decode(),
+        'BLIND_INDEX_KEY': secrets.token_hex(32),
+        'ONA_SERVER_MODE': 'production',
+        'DEBUG': 'False',
+        'WEB_HOST': '127.0.0.1',
+        'WEB_PORT': str(port),
+    })
+    return env
+
+
+def random_complaint(rng, communes):
+    return {
+        'name': rng.choice(['محمد بن علي', 'فاطمة الزهراء', 'عبد القادر سعيد', 'Amina Kaci']),
+        'phone': f"0{rng.choice('567')}{rng.randrange(10 ** 8):08d}",
+        'id_card': str(rng.randrange(10 ** 8, 10 ** 9)),
+        'birth_date': f"{rng.randrange(1950, 2005)}-0{rng.randrange(1, 10)}-1{rng.randrange(10)}",
+        'birth_place': rng.choice(communes),
+        'address': f"حي {rng.randrange(1, 500)} مسكن",
+        'commune': rng.choice(communes),
+        'type': rng.choice(['type_leak', 'type_clog', 'type_smell', 'type_cut', 'type_other']),
+        'problem': 'تسرب مياه الصرف في الشارع منذ عدة أيام',
+    }
+
+
+def prepare_database(complaints, rng):
+    """إنشاء القاعدة المؤقتة (المستخدمون + شكاوى أولية) وجلسات موقعة بمفتاح الخادم.
+    يُستدعى بعد ضبط متغيرات البيئة: app يقرأها عند الاستيراد"""
+    from itsdangerous import URLSafeTimedSerializer
+    from app import app, init_database, prepare_complaint, save_complaints, audit_writer
+    from models import db, User
+    from centers import ALL_COMMUNES
+
+    tracking_ids = []
+    # تقرير التخزين يُطبع على stderr: stdout مخصص لنتيجة JSON
+    with contextlib.redirect_stdout(sys.stderr), app.app_context():
+        init_database()
+        for start in range(0, complaints, 200):
+            batch = []
+            for _ in range(min(200, complaints - start)):
+                complaint, error = prepare_complaint(random_complaint(rng, ALL_COMMUNES))
+                if complaint is not None:
+                    batch.append(complaint)
+            tracking_ids += [payload['tracking_id'] for payload in save_complaints(batch)]
+        users = {user.username: (user.id, user.center_id) for user in User.query.all()}
+        db.engine.dispose()
+    audit_writer.stop()
+
+    # جلسة Flask-Login وحماية CSRF كما ينشئها الخادم (تسجيل الدخول يتطلب قوالب HTML)
+    serializer = app.session_interface.get_signing_serializer(app)
+    csrf_serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='wtf-csrf-token')
+
+    def session_for(user_id=None):
+        raw_token = secrets.token_hex(20)
+        data = {'csrf_token': raw_token}
+        if user_id is not None:
+            data.update({'_user_id': str(user_id), '_fresh': True})
+        return {
+            'cookie': serializer.dumps(data),
+            'csrf': csrf_serializer.dumps(raw_token),
+        }
+
+    sessions = {
+        'citizen': session_for(),
+        'admin': session_for(users['admin'][0]),
+        'centers': {center_id: session_for(user_id)
+                    for username, (user_id, center_id) in users.items() if center_id},
+    }
+    return tracking_ids, sessions, list(ALL_COMMUNES), app.config['SESSION_COOKIE_NAME']
+
+
+def start_server(env, mode, workers, threads, max_requests, log_path):
+    command = [sys.executable, os.path.join(BASE_DIR, 'server.py'), '--mode', mode,
+               '--workers', str(workers), '--threads', str(threads), '--max-requests', str(max_requests)]
+    log = open(log_path, 'w')
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, log
+
+
+def wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('توقف الخادم أثناء التشغيل (انظر سجل الخادم)')
+        try:
+            if requests.get(f"{base_url}/api/centers", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('الخادم لم يصبح جاهزاً في الوقت المحدد')
+
+
+class LoadRun:
+    """تشغيل خليط الطلبات بعدد ثابت من العملاء المتزامنين (كل عميل خيط باتصال keep-alive خاص به)"""
+
+    def __init__(self, base_url, mix, sessions, cookie_name, tracking_ids, communes, seed):
+        self.base_url = base_url
+        self.operations = list(mix)
+        self.weights = [mix[operation] for operation in self.operations]
+        self.sessions = sessions
+        self.cookie_name = cookie_name
+        self.tracking_ids = list(tracking_ids)
+        self.communes = communes
+        self.seed = seed
+        self._lock = threading.Lock()
+
+    def client(self, session):
+        client = requests.Session()
+        client.cookies.set(self.cookie_name, session['cookie'])
+        client.headers['X-CSRFToken'] = session['csrf']
+        return client
+
+    def request(self, rng, clients, operation):
+        """تنفيذ عملية واحدة؛ يرجع (رمز HTTP، هل هو خطأ، هل هو database is locked)"""
+        if operation == 'submit':
+            response = clients['citizen'].post(f"{self.base_url}/api/submit_complaint",
+                                               json=random_complaint(rng, self.communes),
+                                               timeout=30, allow_redirects=False)
+            if response.status_code == 201:
+                with self._lock:
+                    self.tracking_ids.append(response.json()['tracking_id'])
+        elif operation == 'track':
+            with self._lock:
+                tracking_id = rng.choice(self.tracking_ids)
+            response = clients['citizen'].get(f"{self.base_url}/api/track/{tracking_id}",
+                                              timeout=30, allow_redirects=False)
+        elif operation == 'admin':
+            status = rng.choice(['', '', 'جديد', 'حل'])
+            response = clients['admin'].get(f"{self.base_url}/admin", params={'format': 'json', 'status': status},
+                                            timeout=30, allow_redirects=False)
+        else:
+            center_id = rng.choice(list(clients['centers']))
+            response = clients['centers'][center_id].get(f"{self.base_url}/center/{center_id}",
+                                                         params={'format': 'json'},
+                                                         timeout=30, allow_redirects=False)
+        locked = response.status_code >= 500 and 'database is locked' in response.text
+        # إعادة التوجيه (مثلاً إلى صفحة الدخول) فشل أيضاً: الطلب لم يُنفذ
+        return response.status_code, response.status_code >= 300, locked
+
+    def worker(self, index, deadline, record_after, results):
+        rng = random.Random(self.seed * 1000 + index)
+        clients = {
+            'citizen': self.client(self.sessions['citizen']),
+            'admin': self.client(self.sessions['admin']),
+            'centers': {center_id: self.client(session) for center_id, session in self.sessions['centers'].items()},
+        }
+        while True:
+            start = time.perf_counter()
+            if start >= deadline:
+                break
+            operation = rng.choices(self.operations, self.weights)[0]
+            try:
+                status, error, locked = self.request(rng, clients, operation)
+            except requests.RequestException as e:
+                status, error, locked = type(e).__name__, True, False
+            end = time.perf_counter()
+            # فترة الإحماء لا تُحتسب
+            if start >= record_after:
+                results.append((operation, (end - start) * 1000, status, error, locked))
+
+    def run(self, concurrency, duration, warmup):
+        results = []
+        start = time.perf_counter()
+        record_after = start + warmup
+        deadline = record_after + duration
+        threads = [threading.Thread(target=self.worker, args=(index, deadline, record_after, results))
+                   for index in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = max(time.perf_counter() - record_after, 1e-9)
+        return summarize(results, elapsed, concurrency)
+
+
+def summarize(results, elapsed, concurrency):
+    def stats(rows):
+        latencies = sorted(row[1] for row in rows)
+        errors = sum(1 for row in rows if row[3])
+        statuses = {}
+        for row in rows:
+            statuses[str(row[2])] = statuses.get(str(row[2]), 0) + 1
+        return {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / elapsed, 2),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+            'database_locked': sum(1 for row in rows if row[4]),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': round(latencies[-1], 2) if latencies else None,
+            'statuses': statuses,
+        }
+
+    return {
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'overall': stats(results),
+        'operations': {operation: stats([row for row in results if row[0] == operation])
+                       for operation in OPERATIONS if any(row[0] == operation for row in results)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='اختبار حمل ONAMob: تقديم الشكاوى، التتبع ولوحات التحكم')
+    parser.add_argument('--concurrency', default='1,4,16',
+                        help='عدد العملاء المتزامنين؛ عدة مستويات مفصولة بفواصل (افتراضياً 1,4,16)')
+    parser.add_argument('--duration', type=float, default=20, help='مدة القياس لكل مستوى بالثواني')
+    parser.add_argument('--warmup', type=float, default=3, help='مدة الإحماء غير المحتسبة بالثواني')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"أوزان العمليات (افتراضياً {DEFAULT_MIX})")
+    parser.add_argument('--complaints', type=int, default=2000, help='عدد الشكاوى الأولية في القاعدة المؤقتة')
+    parser.add_argument('--mode', choices=['desktop', 'production'], default='production')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='إعادة تدوير عمال gunicorn بعد عدد من الطلبات (0 = معطل لقياس الحالة المستقرة)')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='ملف JSON للنتيجة (وإلا تُطبع)')
+    parser.add_argument('--keep', action='store_true', help='الإبقاء على المجلد المؤقت (القاعدة وسجل الخادم)')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    work_dir = tempfile.mkdtemp(prefix='ona-benchmark-')
+    env = benchmark_env(work_dir, args.port)
+    # نفس البيئة للتهيئة في هذه العملية وللخادم في العملية الفرعية
+    os.environ.update(env)
+    rng = random.Random(args.seed)
+    process = log = None
+    try:
+        print(f"تهيئة القاعدة المؤقتة ({args.complaints} شكوى) في {work_dir}", file=sys.stderr)
+        tracking_ids, sessions, communes, cookie_name = prepare_database(args.complaints, rng)
+        if not tracking_ids:
+            raise RuntimeError('لم تُنشأ أي شكوى أولية')
+
+        process, log = start_server(env, args.mode, args.workers, args.threads, args.max_requests,
+                                    os.path.join(work_dir, 'server.log'))
+        base_url = f"http://127.0.0.1:{args.port}"
+        wait_ready(base_url, process)
+
+        load = LoadRun(base_url, args.mix, sessions, cookie_name, tracking_ids, communes, args.seed)
+        results = []
+        for concurrency in levels:
+            print(f"القياس: {concurrency} عميل متزامن لمدة {args.duration} ثانية", file=sys.stderr)
+            results.append(load.run(concurrency, args.duration, args.warmup))
+
+        report = {
+            'started_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'config': {
+                'mode': args.mode,
+                'workers': args.workers,
+                'threads': args.threads,
+                'max_requests': args.max_requests,
+                'mix': args.mix,
+                'duration_s': args.duration,
+                'warmup_s': args.warmup,
+                'initial_complaints': args.complaints,
+                'seed': args.seed,
+                'python': sys.version.split()[0],
+                'cpu_count': os.cpu_count(),
+            },
+            'levels': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            print(output)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+        if args.keep:
+            print(f"المجلد المؤقت: {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """ذاكرة مؤقتة محدودة الحجم في الذاكرة فقط (LRU) مع مدة صلاحية لكل عنصر.
+    الإصدار (version) اختياري: العنصر المخزن بإصدار مختلف يُعتبر قديماً"""
+
+    def __init__(self, max_size=1000, ttl=120):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                expires_at, entry_version, value = entry
+                if expires_at > time.monotonic() and entry_version == version:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, version, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._items),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
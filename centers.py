@@ -0,0 +1,54 @@
+import json
+import hashlib
+
+# سجل المراكز والبلديات: المصدر الوحيد للخادم وتطبيق الموبايل
+# (code: بادئة المركز في أرقام التتبع، phone: هاتف المركز)
+ONA_CENTERS = {
+    'ferdjioua': {'name': 'مركز فرجيوة', 'code': 'FJ', 'phone': '0666583131',
+                  'communes': ['فرجيوة', 'عين البضاء احريش', 'بني قشة', 'تسدان حدادة', 'العياضي برباس', 'مينار زارزة', 'بوحاتم', 'بن يحي عبد الرحمان']},
+    'mila': {'name': 'مركز ميلة', 'code': 'MA', 'phone': '0770867866',
+             'communes': ['ميلة', 'سيدي خليفة', 'عين التين']},
+    'chelghoum': {'name': 'مركز شلغوم العيد', 'code': 'CH', 'phone': '0770619446',
+                  'communes': ['شلغوم العيد', 'واد العثمانية', 'عين الملوك']},
+    'tadjenanet': {'name': 'مركز تاجنانت', 'code': 'TJ', 'phone': '0770973162',
+                   'communes': ['تاجنانت', 'المشيرة', 'واد خلوف']},
+    'teleghma': {'name': 'مركز التلاغمة', 'code': 'TG', 'phone': '0664718445',
+                 'communes': ['التلاغمة', 'واد سقان']},
+    'grarem': {'name': 'مركز القرارم قوقة', 'code': 'GR', 'phone': '0673025681',
+               'communes': ['القرارم قوقة', 'حمالة']},
+    'ouedendja': {'name': 'مركز وادي انجاء', 'code': 'WD', 'phone': '0770603804',
+                  'communes': ['واد انجاء', 'احمد راشدي', 'تيبرقنت', 'الرواشد', 'زغاية']},
+    'sidimerouane': {'name': 'مركز سيدي مروان', 'code': 'SM', 'phone': '0770943276',
+                     'communes': ['سيدي مروان', 'الشيقارة']},
+    'terraibainen': {'name': 'مركز ترعي باينان', 'code': 'TB', 'phone': '0770278634',
+                     'communes': ['ترعي باينان', 'تسالة لمطاعي', 'اعميرة آراس']}
+}
+
+# فهرس البلدية ← المركز (بحث O(1) عند كل شكوى)
+COMMUNE_INDEX = {
+    commune: center_id
+    for center_id, center in ONA_CENTERS.items()
+    for commune in center['communes']
+}
+
+ALL_COMMUNES = sorted(COMMUNE_INDEX)
+
+
+def get_center_by_commune(commune):
+    """البحث عن المركز بناءً على البلدية"""
+    return COMMUNE_INDEX.get(commune)
+
+
+def centers_payload():
+    """تمثيل السجل كما يُرسل للتطبيقات عبر /api/centers"""
+    return {
+        'version': CENTERS_VERSION,
+        'centers': [dict(center, id=center_id) for center_id, center in ONA_CENTERS.items()]
+    }
+
+
+# الإصدار يتغير تلقائياً مع أي تعديل في السجل (يُستعمل كـ ETag)
+CENTERS_VERSION = hashlib.sha256(
+    json.dumps(ONA_CENTERS, ensure_ascii=False, sort_keys=True).encode()
+).hexdigest()[:16]
+CENTERS_JSON = json.dumps(centers_payload(), ensure_ascii=False)
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskRunner:
+    """تشغيل استدعاءات الشبكة في خيوط الخلفية لكي لا تتجمد الواجهة.
+    لكل مهمة مفتاح: مهمة واحدة معلقة لكل مفتاح (منع التكرار)، وcancel يجعل نتيجة المهمة الجارية تُهمل
+    (رقم الجيل يتغير) لأن طلب HTTP نفسه لا يمكن قطعه"""
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ona-net')
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._generations = {}
+
+    def submit(self, key, func, on_success=None, on_error=None):
+        """تشغيل func في الخلفية ثم استدعاء on_success(result) أو on_error(exception).
+        يرجع False إذا كانت مهمة بنفس المفتاح ما زالت جارية"""
+        with self._lock:
+            if key in self._pending:
+                return False
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            self._pending[key] = generation
+
+        def work():
+            error = None
+            result = None
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+            with self._lock:
+                current = self._generations.get(key) == generation
+                if self._pending.get(key) == generation:
+                    del self._pending[key]
+            # أُلغيت المهمة (مثلاً غادر المستخدم الصفحة): النتيجة تُهمل
+            if not current:
+                return
+            try:
+                if error is None:
+                    if on_success:
+                        on_success(result)
+                elif on_error:
+                    on_error(error)
+            except Exception as e:
+                print(f"خطأ في معالجة نتيجة المهمة {key}: {e}")
+
+        try:
+            self._executor.submit(work)
+        except RuntimeError:
+            # المنفذ أُغلق (انتهت الجلسة): المفتاح لا يبقى معلقاً إلى الأبد
+            with self._lock:
+                if self._pending.get(key) == generation:
+                    del self._pending[key]
+            raise
+        return True
+
+    def cancel(self, key):
+        """إهمال نتيجة المهمة الجارية والسماح بمهمة جديدة بنفس المفتاح فوراً"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            return self._pending.pop(key, None) is not None
+
+    def is_pending(self, key):
+        with self._lock:
+            return key in self._pending
+
+    def shutdown(self):
+        """عند انتهاء الجلسة فقط (page.on_close): لا تُقبل بعده أي مهمة"""
+        with self._lock:
+            for key in list(self._pending):
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._pending.clear()
+        self._executor.shutdown(wait=False)
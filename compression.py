@@ -0,0 +1,129 @@
+import zlib
+import threading
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli اختياري: gzip فقط
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/csv', 'text/plain', 'text/xml', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+
+class Compressor:
+    """ضغط الاستجابات النصية (brotli إن توفر وقبله المتصفح، وإلا gzip) بما فيها المتدفقة.
+    الإعدادات: COMPRESS_MIN_SIZE (بالبايت)، COMPRESS_LEVEL (gzip 1-9)، COMPRESS_BR_LEVEL (brotli 0-11)"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._routes = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        self.app = app
+        app.after_request(self.compress)
+
+    def choose_encoding(self):
+        encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+        return request.accept_encodings.best_match(encodings)
+
+    def should_compress(self, response):
+        if request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        # ملفات مضغوطة مسبقاً (صور، zip، xlsx...) أو أنواع غير نصية أو تدفق SSE
+        if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return False
+        if response.cache_control.no_transform:
+            return False
+        # لا نقرأ جسم الاستجابة المتدفقة لحساب طولها (ذلك يحملها كاملة في الذاكرة)
+        length = response.content_length if response.is_streamed else len(response.get_data())
+        return length is None or length >= self.app.config['COMPRESS_MIN_SIZE']
+
+    def compress(self, response):
+        if not self.should_compress(response):
+            return response
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+
+        route = request.url_rule.rule if request.url_rule else request.path
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoding, route)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            compressed = self._compress_body(data, encoding)
+            response.set_data(compressed)
+            self._record(route, len(data), len(compressed))
+
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Accept-Ranges', None)
+        response.vary.add('Accept-Encoding')
+        # المحتوى المضغوط لا يطابق البايتات الأصلية بايتاً ببايت
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _compress_body(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.app.config['COMPRESS_BR_LEVEL'])
+        compressor = zlib.compressobj(self.app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def _stream(self, iterable, encoding, route):
+        """ضغط تدريجي: كل جزء يُرسل فوراً (sync flush) دون انتظار نهاية الاستجابة"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.app.config['COMPRESS_BR_LEVEL'])
+            process, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+            process = compressor.compress
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            finish = compressor.flush
+        bytes_in = bytes_out = 0
+        try:
+            for chunk in iterable:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if not chunk:
+                    continue
+                bytes_in += len(chunk)
+                block = process(chunk) + flush()
+                bytes_out += len(block)
+                yield block
+            block = finish()
+            bytes_out += len(block)
+            yield block
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+            self._record(route, bytes_in, bytes_out)
+
+    def _record(self, route, bytes_in, bytes_out):
+        with self._lock:
+            entry = self._routes.setdefault(route, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+            entry['responses'] += 1
+            entry['bytes_in'] += bytes_in
+            entry['bytes_out'] += bytes_out
+
+    def stats(self):
+        """البايتات الموفرة لكل مسار (مرتبة من الأكثر توفيراً)"""
+        with self._lock:
+            routes = {route: dict(entry) for route, entry in self._routes.items()}
+        for entry in routes.values():
+            entry['bytes_saved'] = entry['bytes_in'] - entry['bytes_out']
+            entry['ratio'] = round(entry['bytes_out'] / entry['bytes_in'], 3) if entry['bytes_in'] else 1.0
+        return {
+            'brotli': brotli is not None,
+            'routes': dict(sorted(routes.items(), key=lambda item: item[1]['bytes_saved'], reverse=True))
+        }
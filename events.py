@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+
+def event_id(updated_at):
+    """معرف الحدث: توقيت updated_at بالميلي ثانية (يُستعمل في Last-Event-ID للاستئناف)"""
+    return int(updated_at.timestamp() * 1000)
+
+
+class Subscription:
+    """اشتراك عميل واحد في مواضيع محددة (أرقام تتبع أو مراكز). الانتظار على Event لا يستهلك المعالج"""
+
+    def __init__(self, topics, last_event_id=0):
+        self.topics = set(topics)
+        self.since = last_event_id
+        self.last_sent = {}
+        self._events = deque()
+        self._ready = threading.Event()
+
+    def push(self, tracking_id, eid, payload):
+        # نفس التغيير قد يصل من النشر المحلي ومن مراقب قاعدة البيانات
+        if eid <= self.last_sent.get(tracking_id, self.since):
+            return
+        self.last_sent[tracking_id] = eid
+        self._events.append((eid, payload))
+        self._ready.set()
+
+    def wait(self, timeout):
+        """الأحداث الجديدة، أو قائمة فارغة بعد انتهاء المهلة (وقت إرسال نبضة)"""
+        self._ready.wait(timeout)
+        self._ready.clear()
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+
+class StatusBroker:
+    """وسيط أحداث تغير الشكاوى داخل العملية، مع مراقب دوري لقاعدة البيانات
+    لالتقاط التحديثات التي تمت في عمليات (عمال) أخرى.
+    fetch_changes(since): بيانات كل الشكاوى المحدثة بعد since (استعلام على فهرس updated_at)
+    topics(payload): المواضيع التي يُنشر فيها التغيير (افتراضياً رقم التتبع)
+    on_remote_changes(payloads): يُستدعى بالتغييرات التي لم تُنشر محلياً (من عمال آخرين)"""
+
+    def __init__(self, app=None, fetch_changes=None, topics=None, on_remote_changes=None):
+        self.fetch_changes = fetch_changes
+        self.topics = topics or (lambda payload: [payload['tracking_id']])
+        self.on_remote_changes = on_remote_changes
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._local = {}
+        self._count = 0
+        self._poller_pid = None
+        self.published = 0
+        self.polled = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_HEARTBEAT', 20)
+        app.config.setdefault('EVENTS_POLL_INTERVAL', 2.0)
+        app.config.setdefault('EVENTS_MAX_SUBSCRIBERS', 5000)
+        app.config.setdefault('EVENTS_MAX_AGE', 600)
+        self.app = app
+
+    def subscribe(self, topics, last_event_id=0):
+        """اشتراك جديد، أو None إذا بلغ العامل الحد الأقصى للمشتركين"""
+        subscription = Subscription(topics, last_event_id)
+        with self._lock:
+            if self._count >= self.app.config['EVENTS_MAX_SUBSCRIBERS']:
+                return None
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+            self._count += 1
+        self._ensure_poller()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+            self._count -= 1
+
+    def publish(self, payload, local=True):
+        """إرسال بيانات الشكوى المحدثة لكل المشتركين في مواضيعها"""
+        eid = event_id(payload['updated_at'])
+        with self._lock:
+            if local:
+                self._local[payload['tracking_id']] = eid
+            subscribers = set()
+            for topic in self.topics(payload):
+                subscribers.update(self._subscribers.get(topic, ()))
+        if not subscribers:
+            return
+        for subscription in subscribers:
+            subscription.push(payload['tracking_id'], eid, payload)
+        self.published += 1
+
+    def _ensure_poller(self):
+        # خيط واحد لكل عملية (يُعاد تشغيله بعد fork)
+        with self._lock:
+            if self._poller_pid == os.getpid():
+                return
+            self._poller_pid = os.getpid()
+        threading.Thread(target=self._poll, name='status-events', daemon=True).start()
+
+    def _poll(self):
+        # هامش تداخل: تحديث بتوقيت أقدم قد يُثبت بعد استعلام سابق (التكرار يُحذف عند المشترك)
+        overlap = timedelta(seconds=5)
+        since = datetime.utcnow()
+        while True:
+            time.sleep(self.app.config['EVENTS_POLL_INTERVAL'])
+            with self._lock:
+                idle = not self._subscribers
+            if idle:
+                since = datetime.utcnow()
+                continue
+            try:
+                with self.app.app_context():
+                    changes = self.fetch_changes(since - overlap)
+            except Exception as e:
+                print(f"خطأ في مراقبة تحديثات الشكاوى: {e}")
+                continue
+            with self._lock:
+                remote = [payload for payload in changes
+                          if event_id(payload['updated_at']) > self._local.get(payload['tracking_id'], 0)]
+            # قبل النشر: المشتركون يقرؤون حالة محدثة عند استلام الأحداث
+            if remote and self.on_remote_changes is not None:
+                try:
+                    with self.app.app_context():
+                        self.on_remote_changes(remote)
+                except Exception as e:
+                    print(f"خطأ في معالجة تحديثات العمال الآخرين: {e}")
+            for payload in changes:
+                # النشر يتجاهل الشكاوى التي لا مشترك في مواضيعها
+                self.publish(payload, local=False)
+                since = max(since, payload['updated_at'])
+            with self._lock:
+                # ما نُشر محلياً قبل نافذة التداخل لن يعود في الاستعلام
+                cutoff = event_id(since - overlap)
+                self._local = {key: eid for key, eid in self._local.items() if eid >= cutoff}
+            self.polled += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self._count,
+                'topics': len(self._subscribers),
+                'published': self.published,
+                'polls': self.polled
+            }
@@ -0,0 +1,159 @@
+import io
+import csv
+import os
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+# الأعمدة المتاحة للتصدير: (العنوان، العمود في الجدول، مشفر؟)
+EXPORT_COLUMNS = {
+    'tracking_id': ('رقم التتبع', 'tracking_id', False),
+    'center_id': ('المركز', 'center_id', False),
+    'commune': ('البلدية', 'commune', False),
+    'type': ('نوع الشكوى', 'complaint_type', False),
+    'status': ('الحالة', 'status', False),
+    'problem': ('وصف المشكلة', 'problem_description', False),
+    'assigned_to': ('المسؤول', 'assigned_to', False),
+    'notes': ('الملاحظات', 'notes', False),
+    'created_at': ('تاريخ الإنشاء', 'created_at', False),
+    'updated_at': ('آخر تحديث', 'updated_at', False),
+    'resolved_at': ('تاريخ الحل', 'resolved_at', False),
+    'name': ('الاسم', 'name_encrypted', True),
+    'phone': ('الهاتف', 'phone_encrypted', True),
+    'id_card': ('رقم بطاقة التعريف', 'id_card_encrypted', True),
+    'birth_date': ('تاريخ الميلاد', 'birth_date_encrypted', True),
+    'birth_place': ('مكان الميلاد', 'birth_place_encrypted', True),
+    'address': ('العنوان', 'address_encrypted', True),
+}
+
+# الأعمدة الافتراضية لا تتطلب فك أي تشفير
+DEFAULT_COLUMNS = ['tracking_id', 'center_id', 'commune', 'type', 'status', 'created_at', 'updated_at', 'resolved_at']
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+
+
+def parse_columns(raw):
+    """قائمة الأعمدة المطلوبة (مفصولة بفواصل)، أو None إذا احتوت على عمود غير معروف"""
+    if not raw:
+        return list(DEFAULT_COLUMNS)
+    columns = [column.strip() for column in raw.split(',') if column.strip()]
+    if not columns or any(column not in EXPORT_COLUMNS for column in columns):
+        return None
+    return columns
+
+
+def parse_date(value, end=False):
+    """تاريخ بصيغة YYYY-MM-DD؛ نهاية الفترة تشمل اليوم كاملاً"""
+    if not value:
+        return None
+    day = datetime.strptime(value, '%Y-%m-%d')
+    return day + timedelta(days=1) if end else day
+
+
+def export_statement(model, columns, center_id=None, status=None, commune=None,
+                     complaint_type=None, date_from=None, date_to=None):
+    """استعلام يقرأ الأعمدة المطلوبة فقط (دون تحميل كائنات كاملة)"""
+    statement = select(*[getattr(model, EXPORT_COLUMNS[column][1]) for column in columns])
+    if center_id:
+        statement = statement.where(model.center_id == center_id)
+    if status:
+        statement = statement.where(model.status == status)
+    if commune:
+        statement = statement.where(model.commune == commune)
+    if complaint_type:
+        statement = statement.where(model.complaint_type == complaint_type)
+    if date_from:
+        statement = statement.where(model.created_at >= date_from)
+    if date_to:
+        statement = statement.where(model.created_at < date_to)
+    return statement.order_by(model.id)
+
+
+# بداية نص يفسره Excel/LibreOffice كصيغة (=HYPERLINK(...) في نص الشكوى مثلاً)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def _csv_safe(value):
+    # نصوص المواطنين تبقى نصاً عند فتح CSV في Excel: ' في البداية يمنع تنفيذها كصيغة
+    # (في XLSX لا حاجة لها: الخلية نصية صراحة وكانت ستظهر ' حرفياً)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _decrypt(cipher, value):
+    if not value:
+        return ''
+    try:
+        return cipher.decrypt(value.encode()).decode()
+    except Exception:
+        return '***مشفر***'
+
+
+def iter_export_chunks(session, statement, columns, cipher, chunk_size=EXPORT_CHUNK_SIZE):
+    """قراءة الصفوف على دفعات من مؤشر الخادم وفك تشفير الأعمدة المطلوبة فقط لكل دفعة"""
+    encrypted = [index for index, column in enumerate(columns) if EXPORT_COLUMNS[column][2]]
+    result = session.execute(statement.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        chunk = []
+        for row in partition:
+            values = [_cell(value) for value in row]
+            for index in encrypted:
+                values[index] = _decrypt(cipher, row[index])
+            chunk.append(values)
+        yield chunk
+
+
+def iter_csv(chunks, columns):
+    """توليد ملف CSV قطعة بعد قطعة (BOM لكي يقرأ Excel العربية بشكل صحيح)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([EXPORT_COLUMNS[column][0] for column in columns])
+    for chunk in chunks:
+        writer.writerows([_csv_safe(value) for value in values] for values in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_xlsx(chunks, columns, file):
+    """كتابة ملف Excel بوضع write_only (الصفوف لا تبقى في الذاكرة)"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('complaints')
+    sheet.append([EXPORT_COLUMNS[column][0] for column in columns])
+
+    def text_cell(value):
+        # openpyxl يجعل كل نص يبدأ بـ = صيغة: نوع الخلية يُثبت نصاً
+        cell = WriteOnlyCell(sheet, value)
+        cell.data_type = 's'
+        return cell
+
+    for chunk in chunks:
+        for values in chunk:
+            sheet.append([text_cell(value) if isinstance(value, str) else value for value in values])
+    workbook.save(file)
+
+
+def iter_xlsx(chunks, columns, block_size=64 * 1024):
+    """بناء ملف Excel في ملف مؤقت ثم إرساله على أجزاء"""
+    with tempfile.TemporaryFile() as file:
+        write_xlsx(chunks, columns, file)
+        file.seek(0)
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            yield block
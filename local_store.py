@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import requests
+
+# رموز 4xx مؤقتة (انتهاء المهلة، طلب مبكر، تجاوز حد السرعة): تُعاد المحاولة لاحقاً مثل 5xx.
+# باقي 4xx تعني أن الخادم رفض الشكوى نهائياً (إعادة الإرسال لن تغير شيئاً)
+RETRYABLE_STATUSES = {408, 425, 429}
+# الحقول التي تبقى محلياً بعد انتهاء الإرسال (للعرض فقط): البيانات الشخصية تُحذف
+KEPT_FIELDS = ('commune', 'type')
+
+
+def default_store_dir():
+    """مجلد بيانات التطبيق (يحدده Flet على الهاتف، وإلا ~/.onamob)"""
+    return os.getenv('FLET_APP_STORAGE_DATA') or os.path.join(os.path.expanduser('~'), '.onamob')
+
+
+class OfflineQueue:
+    """طابور محلي دائم (SQLite) للشكاوى غير المرسلة. كل شكوى تحمل مفتاح منع تكرار ثابتاً
+    يُرسل في رأس Idempotency-Key، فإعادة الإرسال بعد ضياع الرد لا تنشئ شكوى ثانية.
+    owner يفصل العملاء الذين يتشاركون نفس الملف (كل جلسات متصفح Flet على الخادم):
+    كل عميل يرى ويرسل شكاواه فقط"""
+
+    def __init__(self, path=None, owner=''):
+        if path is None:
+            os.makedirs(default_store_dir(), exist_ok=True)
+            path = os.path.join(default_store_dir(), 'outbox.db')
+        self.path = path
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY, "
+            "submission_key TEXT NOT NULL UNIQUE, "
+            "payload TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'queued', "  # queued / sent / failed
+            "tracking_id TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "last_error TEXT, "
+            "next_attempt_at REAL NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        columns = {row['name'] for row in self._execute('PRAGMA table_info(outbox)')}
+        if 'owner' not in columns:
+            # الشكاوى السابقة بقيت لصاحب الجهاز (owner فارغ في التطبيق الأصلي)
+            self._execute("ALTER TABLE outbox ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        self._execute('CREATE INDEX IF NOT EXISTS ix_outbox_owner_status ON outbox (owner, status)')
+        # شكاوى انتهى إرسالها في نسخة سابقة وما زالت تحمل البيانات الشخصية
+        for row in self._execute("SELECT submission_key, payload FROM outbox WHERE status != 'queued'"):
+            payload = self._scrubbed(row['payload'])
+            if payload != row['payload']:
+                self._execute('UPDATE outbox SET payload = ? WHERE submission_key = ?', (payload, row['submission_key']))
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _scrubbed(payload):
+        """نسخة الحمولة بدون البيانات الشخصية (الاسم، الهاتف، البطاقة...)"""
+        data = json.loads(payload)
+        return json.dumps({key: data[key] for key in KEPT_FIELDS if key in data}, ensure_ascii=False)
+
+    def enqueue(self, payload):
+        """حفظ الشكوى محلياً قبل أي محاولة إرسال؛ يرجع مفتاح منع التكرار"""
+        submission_key = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            'INSERT INTO outbox (owner, submission_key, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (self.owner, submission_key, json.dumps(payload, ensure_ascii=False), now, now)
+        )
+        return submission_key
+
+    def due(self, now=None):
+        """الشكاوى المنتظرة التي حان وقت محاولتها"""
+        return self._execute(
+            "SELECT * FROM outbox WHERE owner = ? AND status = 'queued' AND next_attempt_at <= ? ORDER BY id",
+            (self.owner, now or time.time())
+        )
+
+    def _finish(self, submission_key, assignments, params):
+        """تغيير الحالة النهائية مع حذف البيانات الشخصية: الشكوى لن تُرسل مرة أخرى"""
+        with self._lock:
+            row = self._conn.execute('SELECT payload FROM outbox WHERE submission_key = ?', (submission_key,)).fetchone()
+            if row is not None:
+                self._conn.execute(f'UPDATE outbox SET payload = ?, {assignments} WHERE submission_key = ?',
+                                   (self._scrubbed(row['payload']),) + params + (submission_key,))
+
+    def mark_sent(self, submission_key, tracking_id):
+        self._finish(
+            submission_key,
+            "status = 'sent', tracking_id = ?, attempts = attempts + 1, last_error = NULL, updated_at = ?",
+            (tracking_id, time.time())
+        )
+
+    def mark_retry(self, submission_key, error, delay):
+        now = time.time()
+        self._execute(
+            "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?, "
+            "updated_at = ? WHERE submission_key = ?",
+            (error, now + delay, now, submission_key)
+        )
+
+    def mark_failed(self, submission_key, error):
+        self._finish(
+            submission_key,
+            "status = 'failed', attempts = attempts + 1, last_error = ?, updated_at = ?",
+            (error, time.time())
+        )
+
+    def items(self, limit=20):
+        """آخر الشكاوى المحلية لعرض حالتها (منتظرة / أُرسلت / رُفضت)"""
+        return [
+            dict(row, payload=json.loads(row['payload']))
+            for row in self._execute('SELECT * FROM outbox WHERE owner = ? ORDER BY id DESC LIMIT ?', (self.owner, limit))
+        ]
+
+    def pending_count(self):
+        return self._execute("SELECT COUNT(*) FROM outbox WHERE owner = ? AND status = 'queued'", (self.owner,))[0][0]
+
+
+def sync_outbox(queue, api, path='/api/submit_complaint'):
+    """إرسال الشكاوى المنتظرة بالترتيب؛ يتوقف عند أول خطأ اتصال (لا شبكة).
+    يرجع قائمة (المفتاح، الحالة، رقم التتبع أو رسالة الخطأ) للشكاوى التي تغيرت حالتها"""
+    changes = []
+    for item in queue.due():
+        key = item['submission_key']
+        try:
+            response = api.post(path, json=json.loads(item['payload']),
+                                headers={'Idempotency-Key': key}, idempotent=True)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            queue.mark_retry(key, type(e).__name__, api.delay(item['attempts'] + 1))
+            break
+
+        if response.status_code in (200, 201):
+            tracking_id = response.json().get('tracking_id')
+            queue.mark_sent(key, tracking_id)
+            changes.append((key, 'sent', tracking_id))
+        elif response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES:
+            queue.mark_retry(key, f"HTTP {response.status_code}", api.delay(item['attempts'] + 1))
+            break
+        else:
+            try:
+                message = response.json().get('message')
+            except ValueError:
+                message = None
+            message = message or f"HTTP {response.status_code}"
+            queue.mark_failed(key, message)
+            changes.append((key, 'failed', message))
+    return changes
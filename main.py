@@ -2,8 +2,16 @@ import flet as ft
 import webbrowser
 import os
 import sys
+import json
+import time
+import uuid
+import threading
 import requests
 from datetime import datetime
+from centers import centers_payload
+from api_client import ApiClient, HEARTBEAT
+from client_tasks import TaskRunner
+from local_store import OfflineQueue, sync_outbox
 
 # قاموس الترجمة المدمج لضمان العمل على جميع الأجهزة
 TRANSLATIONS = {
@@ -30,6 +38,13 @@ TRANSLATIONS = {
         'fill_all': 'يرجى ملء جميع الحقول المطلوبة',
         'success_msg': 'تم استقبال شكواك بنجاح',
         'error_msg': 'فشل الإرسال، تحقق من الاتصال',
+        'queued_msg': 'لا يوجد اتصال: حُفظت الشكوى وسترسل تلقائياً',
+        'my_submissions': 'الشكاوى المرسلة من هذا الجهاز',
+        'status_queued': 'في الانتظار',
+        'status_sent': 'أُرسلت',
+        'status_failed': 'مرفوضة',
+        'my_complaints': 'شكاواي',
+        'status_changed': 'تغيرت حالة الشكوى',
         'error_tracking_not_found': 'رقم التتبع غير موجود',
         'type_leak': 'تسرب مياه',
         'type_clog': 'انسداد بالوعة',
@@ -61,6 +76,13 @@ TRANSLATIONS = {
         'fill_all': 'Veuillez remplir tous les champs',
         'success_msg': 'Plainte reçue avec succès',
         'error_msg': "Échec de l'envoi, vérifiez la connexion",
+        'queued_msg': 'Pas de connexion : plainte enregistrée, elle sera envoyée automatiquement',
+        'my_submissions': 'Plaintes envoyées depuis cet appareil',
+        'status_queued': 'En attente',
+        'status_sent': 'Envoyée',
+        'status_failed': 'Refusée',
+        'my_complaints': 'Mes plaintes',
+        'status_changed': 'Nouvel état de la plainte',
         'error_tracking_not_found': 'N° de suivi inexistant',
         'type_leak': "Fuite d'eau",
         'type_clog': 'Obstruction',
@@ -73,6 +95,8 @@ TRANSLATIONS = {
 
 # الإعدادات العامة
 API_BASE_URL = os.getenv("API_URL", "http://127.0.0.1:5000")
+# جلسة HTTP واحدة مشتركة (اتصالات مستمرة وإعادة محاولة للطلبات الآمنة)
+api = ApiClient(API_BASE_URL)
 COLOR_PRIMARY = "#008751"
 COLOR_SECONDARY = "#006b40"
 COLOR_BG = "#F8F9FA"
@@ -84,18 +108,48 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# بيانات المراكز
-ONA_DATA = [
-    {'id': 'ferdjioua', 'name': 'مركز فرجيوة', 'phone': '0666583131', 'communes': ['فرجيوة', 'عين البضاء احريش', 'بني قشة', 'تسدان حدادة', 'العياضي برباس', 'مينار زارزة', 'بوحاتم', 'بن يحي عبد الرحمان']},
-    {'id': 'mila', 'name': 'مركز ميلة', 'phone': '0770867866', 'communes': ['ميلة', 'سيدي خليفة', 'عين التين']},
-    {'id': 'chelghoum', 'name': 'مركز شلغوم العيد', 'phone': '0770619446', 'communes': ['شلغوم العيد', 'واد العثمانية', 'عين الملوك']},
-    {'id': 'tadjenanet', 'name': 'مركز تاجنانت', 'phone': '0770973162', 'communes': ['تاجنانت', 'المشيرة', 'واد خلوف']},
-    {'id': 'teleghma', 'name': 'مركز التلاغمة', 'phone': '0664718445', 'communes': ['التلاغمة', 'واد سقان']},
-    {'id': 'grarem', 'name': 'مركز القرارم قوقة', 'phone': '0673025681', 'communes': ['القرارم قوقة', 'حمالة']},
-    {'id': 'sidimerouane', 'name': 'مركز سيدي مروان', 'phone': '0770943276', 'communes': ['سيدي مروان', 'الشيقارة']},
-    {'id': 'ouedendja', 'name': 'مركز وادي انجاء', 'phone': '0770603804', 'communes': ['واد انجاء', 'احمد راشدي', 'تيبرقنت', 'الرواشد', 'زغاية']},
-    {'id': 'terraibainen', 'name': 'مركز ترعي باينان', 'phone': '0770278634', 'communes': ['ترعي باينان', 'تسالة لمطاعي', 'اعميرة آراس']}
-]
+# فترة محاولة إرسال الشكاوى المحفوظة محلياً (بالثواني)
+OUTBOX_SYNC_INTERVAL = int(os.getenv("OUTBOX_SYNC_INTERVAL", 30))
+
+# أرقام التتبع المحفوظة على الجهاز ("شكاواي") مع آخر حالة معروفة
+MY_COMPLAINTS_KEY = "ona.my_complaints"
+MY_COMPLAINTS_MAX = 50
+
+# نسخة السجل المرفقة بالتطبيق (تُستعمل فقط قبل أول مزامنة مع الخادم)
+BUNDLED_CENTERS = centers_payload()
+CENTERS_CACHE_KEY = "ona.centers"
+
+# معرف المتصفح في وضع الويب: كل جلسات Flet على الخادم تتشارك ملف الطابور نفسه
+OUTBOX_OWNER_KEY = "ona.outbox_owner"
+
+def outbox_owner(page):
+    """صاحب الشكاوى في الطابور المحلي: معرف عشوائي محفوظ في متصفح المواطن (وضع الويب)،
+    أو فارغ في التطبيق الأصلي (الجهاز لمستخدم واحد)"""
+    if not page.web:
+        return ''
+    owner = page.client_storage.get(OUTBOX_OWNER_KEY)
+    if not owner:
+        owner = uuid.uuid4().hex
+        page.client_storage.set(OUTBOX_OWNER_KEY, owner)
+    return owner
+
+def fetch_centers(cached):
+    """إعادة التحقق من سجل المراكز لدى الخادم (If-None-Match)؛ يرجع None إذا لم يتغير"""
+    headers = {"If-None-Match": f'"{cached["version"]}"'} if cached else {}
+    response = api.get("/api/centers", headers=headers)
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+def fetch_tracking(tracking_id):
+    """حالة الشكوى من الخادم، أو None إذا لم يوجد رقم التتبع"""
+    response = api.get(f"/api/track/{tracking_id}")
+    return response.json() if response.status_code == 200 else None
+
+def fetch_tracking_batch(tracking_ids):
+    """حالات عدة شكاوى في طلب واحد؛ يرجع None إذا فشل الطلب"""
+    response = api.get("/api/track/batch", params={"ids": ",".join(tracking_ids)})
+    return response.json()["items"] if response.status_code == 200 else None
 
 def main(page: ft.Page):
     page.title = "ONAMob"
@@ -110,6 +164,19 @@ def main(page: ft.Page):
     
     # اللغة الحالية (افتراضياً العربية)
     current_lang = "ar"
+
+    # استدعاءات الشبكة في خيوط الخلفية (النتائج تُعرض عبر page.update من نفس الخيط)
+    tasks = TaskRunner()
+    # on_disconnect يحدث أيضاً عند انقطاع عابر تعود بعده الجلسة نفسها (التطبيق في الخلفية، سقوط websocket):
+    # الإيقاف عند انتهاء الجلسة فقط
+    session_closed = threading.Event()
+
+    # الشكاوى تُحفظ محلياً أولاً ثم تُرسل (وتُعاد تلقائياً عند عودة الاتصال)
+    outbox = OfflineQueue(owner=outbox_owner(page))
+    last_submitted = None
+
+    # سجل المراكز: من التخزين المحلي أو النسخة المرفقة، ثم يُحدَّث في الخلفية
+    centers_data = page.client_storage.get(CENTERS_CACHE_KEY) or BUNDLED_CENTERS
     
     def get_text(key):
         return TRANSLATIONS[current_lang].get(key, key)
@@ -119,6 +186,8 @@ def main(page: ft.Page):
         current_lang = "fr" if current_lang == "ar" else "ar"
         page.rtl = (current_lang == "ar")
         build_ui()
+        refresh_outbox_list()
+        render_my_complaints()
         page.update()
 
     # page.fonts = {
@@ -134,8 +203,7 @@ def main(page: ft.Page):
     phone_input = ft.TextField(border_radius=10, prefix_icon=ft.icons.PHONE_ANDROID)
     address_input = ft.TextField(border_radius=10, prefix_icon=ft.icons.HOME)
     
-    all_communes = sorted([com for center in ONA_DATA for com in center['communes']])
-    commune_dropdown = ft.Dropdown(options=[ft.dropdown.Option(c) for c in all_communes], border_radius=10)
+    commune_dropdown = ft.Dropdown(border_radius=10)
     
     type_dropdown = ft.Dropdown(border_radius=10)
     problem_input = ft.TextField(multiline=True, min_lines=3, border_radius=10)
@@ -151,6 +219,13 @@ def main(page: ft.Page):
     loading_indicator = ft.ProgressBar(visible=False, color=COLOR_PRIMARY)
     track_loading = ft.ProgressBar(visible=False, color=COLOR_PRIMARY)
     track_result = ft.Column(spacing=10)
+    outbox_list = ft.Column(spacing=5)
+    my_complaints_list = ft.Column(spacing=5)
+
+    # شكاواي: تُعرض فوراً من التخزين المحلي ثم تُحدَّث بطلب واحد
+    my_complaints = page.client_storage.get(MY_COMPLAINTS_KEY) or {}
+    # رقم جيل المتابعة الحية: تغييره يوقف خيط المتابعة الجاري
+    watch_generation = 0
 
     # الحاويات الرئيسية
     home_view = ft.Column(scroll=ft.ScrollMode.AUTO, expand=True)
@@ -164,14 +239,11 @@ def main(page: ft.Page):
         page.update()
 
     def handle_submit(e):
+        nonlocal last_submitted
         if not all([name_input.value, phone_input.value, id_card_input.value, commune_dropdown.value]):
             show_snack(get_text('fill_all'), "red")
             return
 
-        loading_indicator.visible = True
-        submit_btn.disabled = True
-        page.update()
-
         payload = {
             "name": name_input.value,
             "phone": phone_input.value,
@@ -184,64 +256,205 @@ def main(page: ft.Page):
             "problem": problem_input.value or "..."
         }
 
-        try:
-            response = requests.post(f"{API_BASE_URL}/api/submit_complaint", json=payload, timeout=10)
-            if response.status_code == 201:
-                res = response.json()
-                show_snack(f"{get_text('success_msg')}! ID: {res['tracking_id']}")
-                for f in [name_input, id_card_input, birth_date_input, birth_place_input, phone_input, address_input, problem_input]:
-                    f.value = ""
-                commune_dropdown.value = None
+        # الحفظ المحلي فوري: النموذج يُفرغ حتى بدون شبكة، فلا تُرسل الشكوى مرتين
+        last_submitted = outbox.enqueue(payload)
+        for f in [name_input, id_card_input, birth_date_input, birth_place_input, phone_input, address_input, problem_input]:
+            f.value = ""
+        commune_dropdown.value = None
+        loading_indicator.visible = True
+        refresh_outbox_list()
+        sync_now()
+
+    def sync_now():
+        """إرسال الشكاوى المنتظرة في الخلفية (مزامنة واحدة في نفس الوقت)"""
+        tasks.submit("outbox", lambda: sync_outbox(outbox, api), outbox_synced, outbox_sync_failed)
+
+    def outbox_synced(changes):
+        nonlocal last_submitted
+        for key, status, detail in changes:
+            if status == "sent":
+                show_snack(f"{get_text('success_msg')}! ID: {detail}")
+                remember_complaint({"tracking_id": detail})
             else:
-                show_snack(get_text('error_msg'), "red")
-        except Exception as ex:
-            show_snack(f"Error: {str(ex)}", "red")
-        
+                show_snack(f"{get_text('error_msg')}: {detail}", "red")
+            if key == last_submitted:
+                last_submitted = None
+        if last_submitted:
+            show_snack(get_text('queued_msg'), "orange")
+            last_submitted = None
         loading_indicator.visible = False
-        submit_btn.disabled = False
+        refresh_outbox_list()
+        if any(status == "sent" for _, status, _ in changes):
+            refresh_my_complaints()
+        # شكاوى أُضيفت أثناء هذه المزامنة
+        if changes and outbox.due():
+            sync_now()
+
+    def outbox_sync_failed(ex):
+        loading_indicator.visible = False
+        page.update()
+
+    def refresh_outbox_list():
+        colors = {"queued": "orange", "sent": COLOR_PRIMARY, "failed": "red"}
+        items = outbox.items()
+        outbox_list.controls = [ft.Text(get_text('my_submissions'), weight="bold")] if items else []
+        for item in items:
+            outbox_list.controls.append(ft.ListTile(
+                dense=True,
+                leading=ft.Icon(ft.icons.OUTBOX if item["status"] == "queued" else ft.icons.CHECK_CIRCLE if item["status"] == "sent" else ft.icons.ERROR, color=colors[item["status"]]),
+                title=ft.Text(item["tracking_id"] or item["payload"]["commune"]),
+                subtitle=ft.Text(f"{get_text('status_' + item['status'])} - {datetime.fromtimestamp(item['created_at']).strftime('%Y-%m-%d %H:%M')}"),
+            ))
         page.update()
 
+    def sync_loop():
+        # محاولة دورية: الشكاوى المحفوظة تُرسل عند عودة الاتصال دون تدخل المستخدم (حتى انتهاء الجلسة)
+        while not session_closed.wait(OUTBOX_SYNC_INTERVAL):
+            if outbox.pending_count():
+                sync_now()
+
     def handle_search(e):
         if not track_input.value: return
         track_result.controls.clear()
         track_loading.visible = True
         page.update()
-        try:
-            response = requests.get(f"{API_BASE_URL}/api/track/{track_input.value}", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                status_text = data['complaint_status']
-                if current_lang == "fr":
-                    status_text = {"جديد": "Nouveau", "قيد المعالجة": "En cours", "حل": "Résolu"}.get(status_text, status_text)
-                
-                track_result.controls.append(
-                    ft.Container(
-                        content=ft.Column([
-                            ft.ListTile(
-                                leading=ft.Icon(ft.icons.TRACK_CHANGES, color=COLOR_PRIMARY),
-                                title=ft.Text(f"{get_text('tracking_id')}: {data['tracking_id']}", weight="bold"),
-                                subtitle=ft.Text(f"{get_text('created_at')}: {data['created_at']}"),
-                            ),
-                            ft.Divider(),
-                            ft.Padding(
-                                padding=ft.padding.only(left=20, right=20, bottom=10),
-                                content=ft.Column([
-                                    ft.Row([ft.Text(f"{get_text('status')}:", weight="bold"), ft.Badge(text=status_text, bgcolor=COLOR_PRIMARY)]),
-                                    ft.Text(f"{get_text('type')}: {data['type']}"),
-                                    ft.Text(f"{get_text('commune')}: {data['commune']}"),
-                                ], spacing=5)
-                            )
-                        ]),
-                        bgcolor="white", border_radius=15, border=ft.border.all(1, "#EEEEEE")
-                    )
-                )
-            else:
-                track_result.controls.append(ft.Text(get_text('error_tracking_not_found'), color="red", text_align="center"))
-        except:
-            track_result.controls.append(ft.Text("Error", color="red"))
+        # بحث جديد يحل محل البحث الجاري
+        tasks.cancel("track")
+        tracking_id = track_input.value
+        tasks.submit("track", lambda: fetch_tracking(tracking_id), show_track_result, track_failed)
+
+    def track_failed(ex):
+        track_result.controls.append(ft.Text("Error", color="red"))
         track_loading.visible = False
         page.update()
 
+    def status_label(status):
+        if current_lang == "fr":
+            return {"جديد": "Nouveau", "قيد المعالجة": "En cours", "حل": "Résolu"}.get(status, status)
+        return status
+
+    def remember_complaint(data):
+        """إضافة شكوى إلى "شكاواي" أو تحديث حالتها (الأقدم يُحذف بعد MY_COMPLAINTS_MAX)"""
+        my_complaints.pop(data["tracking_id"], None)
+        my_complaints[data["tracking_id"]] = data
+        while len(my_complaints) > MY_COMPLAINTS_MAX:
+            my_complaints.pop(next(iter(my_complaints)))
+        page.client_storage.set(MY_COMPLAINTS_KEY, my_complaints)
+
+    def render_my_complaints():
+        my_complaints_list.controls = [ft.Text(get_text('my_complaints'), weight="bold")] if my_complaints else []
+        for data in reversed(list(my_complaints.values())):
+            my_complaints_list.controls.append(ft.ListTile(
+                dense=True,
+                leading=ft.Icon(ft.icons.TRACK_CHANGES, color=COLOR_PRIMARY),
+                title=ft.Text(data["tracking_id"]),
+                subtitle=ft.Text(f"{status_label(data.get('complaint_status', '-'))} - {data.get('commune', '')}"),
+            ))
+        page.update()
+
+    def refresh_my_complaints():
+        if my_complaints:
+            tasks.submit("my_complaints", lambda: fetch_tracking_batch(list(my_complaints)), apply_my_complaints)
+
+    def apply_my_complaints(items):
+        if not items:
+            return
+        for item in items:
+            if item["found"] and item["tracking_id"] in my_complaints:
+                item.pop("requested_id")
+                item.pop("found")
+                my_complaints[item["tracking_id"]] = item
+        page.client_storage.set(MY_COMPLAINTS_KEY, my_complaints)
+        render_my_complaints()
+
+    def watch_my_complaints():
+        """متابعة حية (SSE) لتغير حالة "شكاواي" أثناء عرض صفحة التتبع"""
+        nonlocal watch_generation
+        watch_generation += 1
+        if my_complaints:
+            threading.Thread(target=watch_loop, args=(watch_generation, list(my_complaints)), daemon=True).start()
+
+    def stop_watching():
+        nonlocal watch_generation
+        watch_generation += 1
+
+    def watch_loop(generation, tracking_ids):
+        last_event_id = None
+        attempt = 0
+        while generation == watch_generation:
+            try:
+                for event in api.events("/api/track/stream", params={"ids": ",".join(tracking_ids)}, last_event_id=last_event_id):
+                    # النبضات تسمح بالتوقف (وإغلاق الاتصال) بعد مغادرة الصفحة دون انتظار حدث
+                    if generation != watch_generation:
+                        return
+                    attempt = 0
+                    if event is HEARTBEAT:
+                        continue
+                    last_event_id = event.get("id", last_event_id)
+                    apply_status_event(json.loads(event["data"]))
+            except requests.HTTPError as e:
+                status = e.response.status_code
+                retry_after = e.response.headers.get("Retry-After", "")
+                # الخادم بلغ حد القنوات المباشرة: تحديث واحد بطلب عادي ثم المحاولة بعد المدة المطلوبة
+                if status == 503:
+                    refresh_my_complaints()
+                    time.sleep(int(retry_after) if retry_after.isdigit() else 30)
+                    continue
+                # تجاوز حد الاتصالات (10 في الدقيقة): الانتظار كما يطلب الخادم
+                if status == 429:
+                    time.sleep(int(retry_after) if retry_after.isdigit() else 60)
+                    continue
+                # باقي 4xx (رقم تتبع غير موجود...): إعادة المحاولة لن تغير شيئاً
+                if 400 <= status < 500:
+                    return
+            except Exception:
+                pass
+            # إعادة الاتصال (مع الاستئناف من آخر حدث) بتأخير متزايد
+            time.sleep(api.delay(attempt))
+            attempt += 1
+
+    def apply_status_event(data):
+        previous = my_complaints.get(data["tracking_id"], {})
+        if previous.get("complaint_status") and previous["complaint_status"] != data["complaint_status"]:
+            show_snack(f"{get_text('status_changed')} {data['tracking_id']}: {status_label(data['complaint_status'])}")
+        my_complaints[data["tracking_id"]] = data
+        page.client_storage.set(MY_COMPLAINTS_KEY, my_complaints)
+        render_my_complaints()
+
+    def show_track_result(data):
+        if data:
+            is_new = data["tracking_id"] not in my_complaints
+            remember_complaint(data)
+            if is_new:
+                watch_my_complaints()
+            status_text = status_label(data['complaint_status'])
+            
+            track_result.controls.append(
+                ft.Container(
+                    content=ft.Column([
+                        ft.ListTile(
+                            leading=ft.Icon(ft.icons.TRACK_CHANGES, color=COLOR_PRIMARY),
+                            title=ft.Text(f"{get_text('tracking_id')}: {data['tracking_id']}", weight="bold"),
+                            subtitle=ft.Text(f"{get_text('created_at')}: {data['created_at']}"),
+                        ),
+                        ft.Divider(),
+                        ft.Padding(
+                            padding=ft.padding.only(left=20, right=20, bottom=10),
+                            content=ft.Column([
+                                ft.Row([ft.Text(f"{get_text('status')}:", weight="bold"), ft.Badge(text=status_text, bgcolor=COLOR_PRIMARY)]),
+                                ft.Text(f"{get_text('type')}: {data['type']}"),
+                                ft.Text(f"{get_text('commune')}: {data['commune']}"),
+                            ], spacing=5)
+                        )
+                    ]),
+                    bgcolor="white", border_radius=15, border=ft.border.all(1, "#EEEEEE")
+                )
+            )
+        else:
+            track_result.controls.append(ft.Text(get_text('error_tracking_not_found'), color="red", text_align="center"))
+        track_loading.visible = False
+        render_my_complaints()
+
     nav_bar = ft.NavigationBar(
         bgcolor="white",
         elevation=10,
@@ -249,6 +462,14 @@ def main(page: ft.Page):
     )
 
     def navigate_to(idx):
+        # مغادرة صفحة التتبع تلغي البحث الجاري (الإرسال يكتمل دائماً)
+        if idx != 2 and tasks.cancel("track"):
+            track_loading.visible = False
+        if idx == 2:
+            refresh_my_complaints()
+            watch_my_complaints()
+        else:
+            stop_watching()
         nav_bar.selected_index = idx
         home_view.visible = (idx == 0)
         complaint_view.visible = (idx == 1)
@@ -270,6 +491,8 @@ def main(page: ft.Page):
         commune_dropdown.label = get_text('commune')
         problem_input.label = get_text('problem')
         track_input.label = get_text('tracking_id')
+        all_communes = sorted([com for center in centers_data['centers'] for com in center['communes']])
+        commune_dropdown.options = [ft.dropdown.Option(c) for c in all_communes]
         submit_btn.text = get_text('submit')
         submit_btn.on_click = handle_submit
         
@@ -335,6 +558,7 @@ def main(page: ft.Page):
                     phone_input, address_input,
                     commune_dropdown, type_dropdown, problem_input,
                     submit_btn,
+                    outbox_list,
                     ft.Container(height=20)
                 ], spacing=12),
                 padding=20, bgcolor="white", border_radius=20, margin=10
@@ -349,14 +573,15 @@ def main(page: ft.Page):
                     track_input,
                     ft.ElevatedButton(get_text('search'), on_click=handle_search, bgcolor=COLOR_PRIMARY, color="white", height=45, width=float("inf")),
                     track_loading,
-                    track_result
+                    track_result,
+                    my_complaints_list
                 ], spacing=15),
                 padding=20, bgcolor="white", border_radius=20, margin=10
             )
         ]
 
         branches_list = ft.Column(spacing=10)
-        for c in ONA_DATA:
+        for c in centers_data['centers']:
             branches_list.controls.append(
                 ft.Container(
                     content=ft.ListTile(
@@ -379,7 +604,25 @@ def main(page: ft.Page):
             )
         ]
 
+    def apply_centers(fresh):
+        nonlocal centers_data
+        if fresh and fresh.get('version') != centers_data.get('version'):
+            page.client_storage.set(CENTERS_CACHE_KEY, fresh)
+            centers_data = fresh
+            build_ui()
+            page.update()
+
+    def close_session(e):
+        session_closed.set()
+        stop_watching()
+        tasks.shutdown()
+
+    page.on_close = close_session
+
     build_ui()
+    cached_centers = page.client_storage.get(CENTERS_CACHE_KEY)
+    tasks.submit("centers", lambda: fetch_centers(cached_centers), apply_centers)
+    threading.Thread(target=sync_loop, daemon=True).start()
     page.add(
         ft.Stack([
             ft.Container(gradient=ft.LinearGradient(begin=ft.alignment.top_left, end=ft.alignment.bottom_right, colors=[COLOR_PRIMARY, COLOR_SECONDARY]), expand=True),
@@ -389,6 +632,12 @@ def main(page: ft.Page):
             ], spacing=0, expand=True)
         ], expand=True)
     )
+    refresh_outbox_list()
+    render_my_complaints()
+    refresh_my_complaints()
+    # ما بقي في الطابور من جلسة سابقة
+    if outbox.pending_count():
+        sync_now()
 
 if __name__ == "__main__":
     ft.app(target=main, assets_dir="assets")
@@ -0,0 +1,344 @@
+import os
+import sys
+import time
+import atexit
+import sqlite3
+import threading
+from bisect import bisect_left
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+# حدود فئات زمن الاستجابة بالثواني
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# حدود فئات عدد استعلامات SQL في الطلب الواحد
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# العائلات بترتيب العرض: (الاسم، النوع، الوصف، طريقة الجمع بين العمليات)
+FAMILIES = (
+    ('ona_http_requests_total', 'counter', 'Requests by route, method and status code.', 'sum'),
+    ('ona_http_request_exceptions_total', 'counter', 'Unhandled exceptions by route.', 'sum'),
+    ('ona_http_request_duration_seconds', 'histogram',
+     'Time until the response headers are ready (streamed bodies excluded).', 'sum'),
+    ('ona_http_request_sql_queries', 'histogram', 'SQL statements executed per request.', 'sum'),
+    ('ona_sql_queries_total', 'counter', 'SQL statements by route (background for worker threads).', 'sum'),
+    ('ona_sql_duration_seconds_total', 'counter', 'Time spent executing SQL statements by route.', 'sum'),
+    ('ona_fernet_operations_total', 'counter', 'Fernet encrypt and decrypt calls.', 'sum'),
+    ('ona_ratelimit_rejections_total', 'counter', 'Requests rejected by the rate limiter by route.', 'sum'),
+    ('ona_process_start_time_seconds', 'gauge', 'Start time of the oldest live worker since the epoch.', 'min'),
+)
+SUMMED_FAMILIES = tuple(family for family, _, _, aggregate in FAMILIES if aggregate == 'sum')
+# عمليات منتهية (عمال أُعيد تدويرهم أو تشغيل سابق) تُدمج قيمها هنا لكي لا تنقص العدادات
+RETIRED = 'retired'
+
+
+class Histogram:
+    """مدرج تكراري تراكمي بصيغة Prometheus (عدادات لكل فئة + المجموع + العدد)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def process_alive(pid):
+    if sys.platform == 'win32':
+        # os.kill على ويندوز ينهي العملية؛ waitress عملية واحدة أصلاً
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics:
+    """قياسات الأداء: زمن كل مسار، عدد الطلبات والأخطاء، استعلامات SQL وزمنها،
+    عمليات التشفير، ورفض محدد السرعة. تُعرض بصيغة Prometheus النصية.
+    كل عملية (عامل gunicorn) تجمع قياساتها في الذاكرة وتكتبها كل METRICS_FLUSH_INTERVAL ثانية
+    في ملف SQLite مشترك (METRICS_DB)، و/metrics يعرض مجموعها لكل العمال (مثل وضع multiprocess
+    في prometheus_client): أي عامل يجيب على الطلب يعطي نفس الأرقام.
+    الكلفة: قفل وعملية bisect لكل طلب ولكل استعلام، وكتابة دفعة واحدة كل بضع ثوانٍ"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._reset()
+        self.path = None
+        self.flush_interval = 5.0
+        self.busy_timeout = 5000
+        self._local = threading.local()
+        self._flusher = None
+        self._flusher_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def _reset(self):
+        self._requests = {}
+        self._latency = {}
+        self._exceptions = {}
+        self._sql = {}
+        self._sql_per_request = {}
+        self._fernet = {}
+        self._rate_limited = {}
+        self.started_at = time.time()
+        self.pid = os.getpid()
+        # رقم العملية قد يُعاد استعماله: المعرف يشمل وقت البدء
+        self.process = f"{self.pid}-{self.started_at:.6f}"
+
+    def init_app(self, app):
+        """يُسجل قبل باقي المعالجات لكي يشمل القياس كل before_request (محدد السرعة، الجلسة...)"""
+        app.before_request(self._start)
+        app.after_request(self._response)
+        app.teardown_request(self._finish)
+
+    def init_store(self, app):
+        """الملف المشترك بين العمال (METRICS_DB)؛ بدونه تُعرض قياسات العملية التي أجابت فقط"""
+        self.path = app.config.get('METRICS_DB')
+        self.flush_interval = max(0.5, app.config.get('METRICS_FLUSH_INTERVAL', 5.0))
+        if not self.path:
+            return
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metric_samples ("
+                "process TEXT NOT NULL, pid INTEGER NOT NULL, family TEXT NOT NULL, sample TEXT NOT NULL, "
+                "seq INTEGER NOT NULL, value NUMERIC NOT NULL, PRIMARY KEY (process, family, sample)) WITHOUT ROWID"
+            )
+        atexit.register(self.flush)
+
+    def _connection(self):
+        """اتصال لكل خيط (ويُعاد إنشاؤه بعد fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_process(self):
+        """بعد fork: العامل يبدأ من الصفر (لا يرث أرقام العملية الأم) ويشغل خيط الكتابة الخاص به"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            if self.pid != os.getpid():
+                self._reset()
+            self._flusher_pid = os.getpid()
+            if self.path:
+                self._flusher = threading.Thread(target=self._run_flusher, name='metrics-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"خطأ في كتابة القياسات: {e}")
+
+    def init_engine(self, app, db):
+        """ربط عدّاد الاستعلامات بمحرك قاعدة البيانات (بعد db.init_app)"""
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor)
+            event.listen(db.engine, 'handle_error', self._cursor_error)
+
+    def instrument_cipher(self, cipher):
+        """عدّ عمليات encrypt/decrypt على كائن Fernet المشترك"""
+        for operation in ('encrypt', 'decrypt'):
+            method = getattr(cipher, operation)
+
+            def counted(*args, _method=method, _operation=operation, **kwargs):
+                with self._lock:
+                    self._fernet[_operation] = self._fernet.get(_operation, 0) + 1
+                return _method(*args, **kwargs)
+
+            setattr(cipher, operation, counted)
+
+    def rate_limited(self, limit):
+        """يُمرر إلى Limiter(on_breach=...)"""
+        route = self._route()
+        with self._lock:
+            self._rate_limited[route] = self._rate_limited.get(route, 0) + 1
+
+    @staticmethod
+    def _route():
+        if not has_request_context():
+            return 'background'
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+
+    def _start(self):
+        self._ensure_process()
+        g._metrics_start = time.perf_counter()
+        g._metrics_sql = 0
+
+    def _response(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _finish(self, exc=None):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        status = 500 if exc is not None else g.pop('_metrics_status', 500)
+        route = self._route()
+        key = (route, request.method, status)
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get(route)
+            if histogram is None:
+                histogram = self._latency[route] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            histogram = self._sql_per_request.get(route)
+            if histogram is None:
+                histogram = self._sql_per_request[route] = Histogram(SQL_COUNT_BUCKETS)
+            histogram.observe(g.pop('_metrics_sql', 0))
+            if exc is not None:
+                self._exceptions[route] = self._exceptions.get(route, 0) + 1
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['_metrics_query_start'].pop()
+        self._record_query(elapsed)
+
+    def _cursor_error(self, exception_context):
+        starts = exception_context.connection.info.get('_metrics_query_start') \
+            if exception_context.connection is not None else None
+        if starts:
+            self._record_query(time.perf_counter() - starts.pop())
+
+    def _record_query(self, elapsed):
+        route = self._route()
+        # الاستعلامات أثناء تدفق الاستجابة (التصدير) تُحسب للمسار بعد انتهاء قياس الطلب
+        if has_request_context() and '_metrics_sql' in g:
+            g._metrics_sql += 1
+        with self._lock:
+            entry = self._sql.get(route)
+            if entry is None:
+                entry = self._sql[route] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def _samples(self):
+        """قياسات هذه العملية: (العائلة، اسم العينة مع تسمياتها، القيمة) بترتيب العرض"""
+        samples = []
+
+        def sample(family, labels, value, suffix=''):
+            samples.append((family, f'{family}{suffix}{format_labels(labels)}', value))
+
+        def histograms(family, data, label):
+            for key, histogram in sorted(data.items()):
+                for bound, count in histogram.cumulative():
+                    sample(family, ((label, key), ('le', bound)), count, '_bucket')
+                sample(family, ((label, key),), histogram.sum, '_sum')
+                sample(family, ((label, key),), histogram.count, '_count')
+
+        with self._lock:
+            for (route, method, status), count in sorted(self._requests.items()):
+                sample('ona_http_requests_total', (('route', route), ('method', method), ('status', status)), count)
+            for route, count in sorted(self._exceptions.items()):
+                sample('ona_http_request_exceptions_total', (('route', route),), count)
+            histograms('ona_http_request_duration_seconds', self._latency, 'route')
+            histograms('ona_http_request_sql_queries', self._sql_per_request, 'route')
+            for route, (count, _) in sorted(self._sql.items()):
+                sample('ona_sql_queries_total', (('route', route),), count)
+            for route, (_, seconds) in sorted(self._sql.items()):
+                sample('ona_sql_duration_seconds_total', (('route', route),), seconds)
+            for operation in ('encrypt', 'decrypt'):
+                sample('ona_fernet_operations_total', (('operation', operation),), self._fernet.get(operation, 0))
+            for route, count in sorted(self._rate_limited.items()):
+                sample('ona_ratelimit_rejections_total', (('route', route),), count)
+        sample('ona_process_start_time_seconds', (), self.started_at)
+        return samples
+
+    def flush(self):
+        """كتابة قياسات هذه العملية في الملف المشترك، ودمج قياسات العمليات المنتهية"""
+        if not self.path or self.pid != os.getpid():
+            return
+        rows = [(self.process, self.pid, family, name, seq, value)
+                for seq, (family, name, value) in enumerate(self._samples())]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM metric_samples WHERE process = ?', (self.process,))
+            conn.executemany('INSERT INTO metric_samples (process, pid, family, sample, seq, value) '
+                             'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            for pid, in conn.execute('SELECT DISTINCT pid FROM metric_samples WHERE process != ? AND pid != ?',
+                                     (RETIRED, self.pid)).fetchall():
+                if not process_alive(pid):
+                    self._retire(conn, pid)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _retire(conn, pid):
+        # العدادات تُضاف إلى RETIRED؛ المقاييس اللحظية (gauge) للعملية المنتهية تُحذف فقط
+        conn.execute(
+            'INSERT INTO metric_samples (process, pid, family, sample, seq, value) '
+            f"SELECT ?, 0, family, sample, seq, value FROM metric_samples WHERE pid = ? "
+            f"AND family IN ({','.join('?' * len(SUMMED_FAMILIES))}) "
+            'ON CONFLICT (process, family, sample) DO UPDATE SET '
+            'value = value + excluded.value, seq = min(seq, excluded.seq)',
+            (RETIRED, pid, *SUMMED_FAMILIES)
+        )
+        conn.execute('DELETE FROM metric_samples WHERE pid = ?', (pid,))
+
+    def render(self):
+        """النص المعروض في /metrics (Prometheus text exposition 0.0.4): مجموع كل العمال"""
+        if self.path:
+            self.flush()
+            rows = self._connection().execute(
+                'SELECT family, sample, SUM(value), MIN(value) FROM metric_samples '
+                'GROUP BY family, sample ORDER BY MIN(seq)'
+            ).fetchall()
+        else:
+            rows = [(family, name, value, value) for family, name, value in self._samples()]
+        by_family = {}
+        for family, name, total, minimum in rows:
+            by_family.setdefault(family, []).append((name, total, minimum))
+
+        lines = []
+        for family, kind, help_text, aggregate in FAMILIES:
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            for name, total, minimum in by_family.get(family, ()):
+                lines.append(f'{name} {format_value(minimum if aggregate == "min" else total)}')
+        return '\n'.join(lines) + '\n'
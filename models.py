@@ -3,7 +3,12 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin, current_user
 from datetime import datetime
 from cryptography.fernet import Fernet
+from search import normalize_text
 import os
+import re
+import hmac
+import base64
+import hashlib
 
 db = SQLAlchemy()
 
@@ -15,6 +20,40 @@ if not ENCRYPTION_KEY:
 
 cipher = Fernet(ENCRYPTION_KEY.encode() if isinstance(ENCRYPTION_KEY, str) else ENCRYPTION_KEY)
 
+# مفتاح الفهارس العمياء (HMAC) منفصل عن مفتاح التشفير؛ يُشتق منه إذا لم يُحدد
+BLIND_INDEX_KEY = os.environ.get('BLIND_INDEX_KEY')
+if BLIND_INDEX_KEY:
+    BLIND_INDEX_KEY = BLIND_INDEX_KEY.encode()
+else:
+    BLIND_INDEX_KEY = hmac.new(
+        base64.urlsafe_b64decode(ENCRYPTION_KEY), b'ona-blind-index', hashlib.sha256
+    ).digest()
+
+# فهرسة كلمات الاسم (اختيارية)
+BLIND_INDEX_NAMES = os.environ.get('BLIND_INDEX_NAMES', 'True') == 'True'
+
+def blind_index(value):
+    """بصمة HMAC ثابتة تسمح بالبحث بالمساواة دون فك التشفير"""
+    if not value:
+        return None
+    return hmac.new(BLIND_INDEX_KEY, value.encode(), hashlib.sha256).hexdigest()[:32]
+
+def normalize_phone(phone):
+    """توحيد رقم الهاتف: 0661234567 و +213661234567 و 00213 661 23 45 67 متطابقة"""
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('00213'):
+        digits = '0' + digits[5:]
+    elif digits.startswith('213') and len(digits) == 12:
+        digits = '0' + digits[3:]
+    return digits
+
+def normalize_id_card(id_card):
+    return re.sub(r'[\s\-]', '', id_card or '').upper()
+
+def name_tokens(name):
+    """كلمات الاسم بعد التطبيع (بدون تكرار)"""
+    return sorted(set(re.findall(r'\w+', normalize_text(name))))
+
 class User(UserMixin, db.Model):
     """نموذج المستخدمين (المسؤولون)"""
     __tablename__ = 'users'
@@ -64,16 +103,29 @@ class Complaint(db.Model):
     
     # الوقت والتتبع
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     resolved_at = db.Column(db.DateTime, nullable=True)
     
     # بيانات المركز المعني
     center_id = db.Column(db.String(50), nullable=False, index=True)
     
+    # مفتاح منع التكرار الذي يرسله التطبيق (Idempotency-Key): إعادة الإرسال لا تنشئ شكوى ثانية
+    submission_key = db.Column(db.String(64), nullable=True, unique=True, index=True)
+    
+    # فهارس عمياء (HMAC) للبحث عن سجل المواطن دون فك التشفير
+    phone_bidx = db.Column(db.String(64), nullable=True, index=True)
+    id_card_bidx = db.Column(db.String(64), nullable=True, index=True)
+    name_tokens = db.relationship('ComplaintNameToken', backref='complaint', lazy='dynamic',
+                                  cascade='all, delete-orphan')
+    
     def encrypt_data(self, name, phone, birth_date=None, birth_place=None, address=None, id_card=None):
         """تشفير بيانات المواطن"""
         self.name_encrypted = cipher.encrypt(name.encode()).decode()
         self.phone_encrypted = cipher.encrypt(phone.encode()).decode()
+        self.phone_bidx = blind_index(normalize_phone(phone))
+        self.id_card_bidx = blind_index(normalize_id_card(id_card))
+        if BLIND_INDEX_NAMES:
+            self.name_tokens = [ComplaintNameToken(token_bidx=blind_index(token)) for token in name_tokens(name)]
         if birth_date:
             self.birth_date_encrypted = cipher.encrypt(birth_date.encode()).decode()
         if birth_place:
@@ -136,6 +188,14 @@ class Complaint(db.Model):
             'id_card': self.decrypt_id_card()
         }
 
+class ComplaintNameToken(db.Model):
+    """بصمات كلمات اسم المواطن (فهرس أعمى للبحث بالاسم)"""
+    __tablename__ = 'complaint_name_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), nullable=False, index=True)
+    token_bidx = db.Column(db.String(64), nullable=False, index=True)
+
 class AuditLog(db.Model):
     """نموذج سجلات التدقيق الأمنية"""
     __tablename__ = 'audit_logs'
@@ -0,0 +1,79 @@
+import json
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(sort_value, row_id):
+    """ترميز موضع الصف (التاريخ، المعرف) في مؤشر مبهم صالح للروابط"""
+    raw = json.dumps([sort_value.isoformat() if sort_value else None, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """فك ترميز المؤشر، ويرجع None إذا كان غير صالح"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception:
+        return None
+
+
+class KeysetPage:
+    """صفحة نتائج مرقمة بالمؤشرات بدلاً من OFFSET"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+        # العدد الإجمالي تقريبي (أو None) حتى لا نحتاج COUNT(*) في كل صفحة
+        self.total = total
+
+    def to_dict(self, serialize):
+        return {
+            'items': [serialize(item) for item in self.items],
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'approx_total': self.total
+        }
+
+
+def keyset_paginate(query, sort_column, id_column, after=None, before=None, per_page=20, total=None):
+    """ترقيم تنازلي حسب (sort_column, id_column) انطلاقاً من مؤشر after أو before"""
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    if before_key:
+        # الصفحة السابقة: نقرأ تصاعدياً ثم نعكس الترتيب
+        rows = query.filter(tuple_(sort_column, id_column) > before_key) \
+            .order_by(sort_column.asc(), id_column.asc()) \
+            .limit(per_page + 1).all()
+        has_more_before = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_more_after = True
+    else:
+        if after_key:
+            query = query.filter(tuple_(sort_column, id_column) < after_key)
+        rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+        has_more_after = len(rows) > per_page
+        items = rows[:per_page]
+        has_more_before = after_key is not None
+
+    sort_key = sort_column.key
+    id_key = id_column.key
+    next_cursor = prev_cursor = None
+    if items and has_more_after:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_key), getattr(last, id_key))
+    if items and has_more_before:
+        first = items[0]
+        prev_cursor = encode_cursor(getattr(first, sort_key), getattr(first, id_key))
+
+    return KeysetPage(items, per_page, next_cursor, prev_cursor, total)
@@ -0,0 +1,129 @@
+import os
+import time
+import sqlite3
+import threading
+from math import floor
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """تخزين عدادات محدد السرعة في ملف SQLite مشترك بين كل عمليات الخادم.
+    الاستعمال: storage_uri="sqlite:///path/to/ratelimit.db" مع strategy="sliding-window-counter"
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+    # حذف العدادات المنتهية مرة كل هذا العدد من عمليات الكتابة
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        # نفس صيغة SQLAlchemy: sqlite:///relative.db أو sqlite:////absolute.db
+        self.path = uri[len('sqlite:///'):] if uri and uri.startswith('sqlite:///') else 'ratelimit.db'
+        self.busy_timeout = int(options.get('busy_timeout', 5000))
+        self._local = threading.local()
+        self._writes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, value INTEGER NOT NULL, expiry REAL NOT NULL) WITHOUT ROWID"
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """اتصال لكل خيط (ويُعاد إنشاؤه بعد fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute(f'PRAGMA busy_timeout = {self.busy_timeout}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _get(self, conn, key, now):
+        row = conn.execute('SELECT value FROM rate_limits WHERE key = ? AND expiry > ?', (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def _incr(self, conn, key, expiry, amount, now):
+        # العداد المنتهي يبدأ من جديد داخل نفس العملية دون حذف مسبق
+        value = conn.execute(
+            'INSERT INTO rate_limits (key, value, expiry) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'value = CASE WHEN expiry <= ? THEN excluded.value ELSE value + excluded.value END, '
+            'expiry = CASE WHEN expiry <= ? THEN excluded.expiry ELSE expiry END '
+            'RETURNING value',
+            (key, amount, now + expiry, now, now)
+        ).fetchone()[0]
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM rate_limits WHERE expiry <= ?', (now,))
+        return value
+
+    def incr(self, key, expiry, amount=1):
+        return self._incr(self._connection(), key, expiry, amount, time.time())
+
+    def get(self, key):
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expiry FROM rate_limits WHERE key = ? AND expiry > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        """قراءة النافذتين والزيادة في معاملة واحدة: لا سباق بين العمليات"""
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            previous_count, previous_ttl, current_count, _ = self._window(conn, previous_key, current_key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                conn.execute('COMMIT')
+                return False
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            conn.execute('COMMIT')
+            return True
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _window(self, conn, previous_key, current_key, expiry, now):
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._window(self._connection(), previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
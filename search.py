@@ -0,0 +1,200 @@
+import re
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from translations import TRANSLATIONS
+
+FTS_TABLE = 'complaints_fts'
+INDEXED_FIELDS = ('tracking_id', 'commune', 'complaint_type', 'problem_description')
+
+# التشكيل والتطويل في العربية
+ARABIC_MARKS = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+# توحيد أشكال الحروف التي يكتبها المستخدمون بطرق مختلفة
+ARABIC_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه'
+})
+
+
+def normalize_text(value):
+    """تطبيع النص العربي قبل الفهرسة والبحث (الحركات الفرنسية يزيلها المقسّم unicode61)"""
+    if not value:
+        return ''
+    return ARABIC_MARKS.sub('', value).translate(ARABIC_LETTERS).lower()
+
+
+def build_match_query(search_query):
+    """تحويل نص المستخدم إلى تعبير MATCH آمن: كل كلمة بادئة، والكلمات مجتمعة (AND)"""
+    tokens = re.findall(r'\w+', normalize_text(search_query))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class ComplaintSearchIndex:
+    """فهرس FTS5 للشكاوى يُحدَّث عبر أحداث النموذج"""
+
+    def __init__(self, app=None, db=None, model=None):
+        self.db = None
+        self.model = None
+        self.available = None
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        self.db = db
+        self.model = model
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(model, 'after_update', self._after_update)
+        event.listen(model, 'after_delete', self._after_delete)
+
+        @app.cli.command('rebuild-search-index')
+        def rebuild_search_index_command():
+            """إعادة بناء فهرس البحث من جدول الشكاوى"""
+            count = self.rebuild()
+            print(f"تمت فهرسة {count} شكوى")
+
+    def _document(self, complaint):
+        """قيم الأعمدة المفهرسة بعد التطبيع (نوع الشكوى يُفهرس بترجمتيه)"""
+        complaint_type = complaint.complaint_type or ''
+        type_labels = ' '.join({
+            complaint_type,
+            TRANSLATIONS['ar'].get(complaint_type, ''),
+            TRANSLATIONS['fr'].get(complaint_type, '')
+        })
+        return {
+            'tracking_id': normalize_text(complaint.tracking_id),
+            'commune': normalize_text(complaint.commune),
+            'complaint_type': normalize_text(type_labels),
+            'problem_description': normalize_text(complaint.problem_description)
+        }
+
+    def _exists(self, connection):
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+
+    def _create(self, connection):
+        """إنشاء الجدول الافتراضي وفهرسة الشكاوى الموجودة إذا كان جديداً؛ يرجع False إذا لم يدعم SQLite الإضافة FTS5"""
+        if connection.dialect.name != 'sqlite':
+            self.available = False
+            return False
+        try:
+            exists = self._exists(connection)
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(INDEXED_FIELDS)}, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            if not exists:
+                self._fill(connection)
+            self.available = True
+        except Exception as e:
+            print(f"فهرس البحث غير متاح: {e}")
+            self.available = False
+        return self.available
+
+    def ensure_index(self):
+        """إنشاء الفهرس وملؤه في معاملة مستقلة (عند تهيئة قاعدة البيانات، وليس أثناء الطلبات)"""
+        with self.db.engine.begin() as connection:
+            return self._create(connection)
+
+    def is_available(self, connection):
+        """هل الفهرس موجود؟ (قراءة فقط: الإنشاء يتم في ensure_index)"""
+        if self.available is None:
+            if connection.dialect.name != 'sqlite':
+                self.available = False
+            elif self._exists(connection):
+                self.available = True
+            else:
+                # لم يُنشأ بعد: الشكاوى الحالية ستُفهرس كلها عند إنشائه
+                return False
+        return self.available
+
+    def _insert(self, connection, complaints):
+        # REPLACE: التحديث يستبدل السطر بنفس rowid دون DELETE منفصل
+        connection.execute(
+            text(f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, {', '.join(INDEXED_FIELDS)}) "
+                 f"VALUES (:id, {', '.join(':' + f for f in INDEXED_FIELDS)})"),
+            [{'id': complaint.id, **self._document(complaint)} for complaint in complaints]
+        )
+
+    def _after_flush(self, session, flush_context):
+        # كل الشكاوى الجديدة في الدفعة بعبارة INSERT واحدة (executemany) بدلاً من سطر لكل شكوى
+        complaints = [instance for instance in session.new if isinstance(instance, self.model)]
+        if not complaints:
+            return
+        connection = session.connection()
+        if self.is_available(connection):
+            self._insert(connection, complaints)
+
+    def _after_update(self, mapper, connection, target):
+        state = inspect(target)
+        if not any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+            return
+        if self.is_available(connection):
+            self._insert(connection, [target])
+
+    def _after_delete(self, mapper, connection, target):
+        if self.is_available(connection):
+            connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': target.id})
+
+    def _fill(self, connection, chunk_size=1000):
+        """فهرسة الشكاوى الموجودة على دفعات"""
+        table = self.model.__table__
+        columns = [table.c.id] + [table.c[field] for field in INDEXED_FIELDS]
+        insert = text(f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(INDEXED_FIELDS)}) "
+                      f"VALUES (:id, {', '.join(':' + f for f in INDEXED_FIELDS)})")
+        count = 0
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                table.select().with_only_columns(*columns)
+                .where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            connection.execute(insert, [{'id': row.id, **self._document(row)} for row in rows])
+            count += len(rows)
+            last_id = rows[-1].id
+        return count
+
+    def rebuild(self):
+        """حذف الفهرس وإعادة بنائه بالكامل"""
+        with self.db.engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+            if not self._create(connection):
+                return 0
+            return connection.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+
+    def condition(self, search_query):
+        """شرط SQL لمطابقة نص البحث (مع بديل LIKE إذا لم يتوفر FTS5)، أو None إذا كان النص فارغاً"""
+        match = build_match_query(search_query)
+        if not match:
+            return None
+        if not self.is_available(self.db.session.connection()):
+            return (self.model.tracking_id.contains(search_query)) | \
+                (self.model.commune.contains(search_query))
+        matching_ids = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query") \
+            .bindparams(fts_query=match).columns(self.model.id)
+        return self.model.id.in_(matching_ids)
+
+    def filter_query(self, query, search_query):
+        """تقييد استعلام الشكاوى بنتائج البحث"""
+        condition = self.condition(search_query)
+        return query if condition is None else query.filter(condition)
+
+    def search(self, search_query, limit=50):
+        """بحث مرتب حسب الصلة (bm25)، يرجع قائمة (الشكوى، الترتيب)"""
+        match = build_match_query(search_query)
+        if not match:
+            return []
+        if not self.is_available(self.db.session.connection()):
+            rows = self.filter_query(self.model.query, search_query) \
+                .order_by(self.model.created_at.desc()).limit(limit).all()
+            return [(complaint, None) for complaint in rows]
+        # رقم التتبع والبلدية أثقل وزناً من النوع والوصف
+        ranked = self.db.session.execute(
+            text(f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 5.0, 2.0, 1.0) AS rank FROM {FTS_TABLE} "
+                 f"WHERE {FTS_TABLE} MATCH :fts_query ORDER BY rank LIMIT :limit"),
+            {'fts_query': match, 'limit': limit}
+        ).all()
+        complaints = {c.id: c for c in self.model.query.filter(self.model.id.in_([r.rowid for r in ranked]))}
+        return [(complaints[r.rowid], r.rank) for r in ranked if r.rowid in complaints]
@@ -0,0 +1,170 @@
+import os
+import sys
+import argparse
+import multiprocessing
+
+# العمال غير المتزامنين: قناة SSE الخاملة لا تحجز خيطاً
+ASYNC_WORKER_CLASSES = ('gevent', 'eventlet')
+
+
+def events_enabled():
+    """قنوات SSE (/api/track/stream و/api/dashboard/stream)؛ EVENTS_ENABLED=False يجعل العملاء يستعلمون دورياً"""
+    return os.environ.get('EVENTS_ENABLED', 'True') == 'True'
+
+
+def patch_async_worker(mode):
+    """WEB_WORKER_CLASS=gevent (اختياري): الترقيع قبل استيراد التطبيق لكي تصبح أقفاله وخيوطه تعاونية
+    (العامل يرقع ما تبقى بعد fork). يُستدعى من server.main ومن app.py عند تشغيله مباشرة"""
+    if mode != 'production' or sys.platform == 'win32':
+        return
+    if os.environ.get('WEB_WORKER_CLASS') == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def server_options(mode='production', **overrides):
+    """إعدادات الخادم (من متغيرات البيئة ثم من سطر الأوامر)"""
+    options = {
+        # وضع سطح المكتب يستمع محلياً فقط
+        'host': os.environ.get('WEB_HOST', '0.0.0.0' if mode == 'production' else '127.0.0.1'),
+        'port': int(os.environ.get('WEB_PORT', 5000)),
+        'workers': int(os.environ.get('WEB_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8))),
+        'threads': int(os.environ.get('WEB_THREADS', 8)),
+        # gthread افتراضياً: sqlite3 لا يتخلى عن المعالج لـ gevent (حتى أثناء انتظار busy_timeout)،
+        # فانتظار قفل واحد في عامل gevent يوقف كل طلباته وقنواته
+        'worker_class': os.environ.get('WEB_WORKER_CLASS', 'gthread'),
+        # اتصالات متزامنة لكل عامل gevent (قنوات SSE الخاملة)؛ تحتاج ulimit -n أكبر منها
+        'worker_connections': int(os.environ.get('WEB_WORKER_CONNECTIONS', 5000)),
+        # إعادة تشغيل العامل بعد عدد من الطلبات لتفادي تراكم الذاكرة
+        'max_requests': int(os.environ.get('WEB_MAX_REQUESTS', 2000)),
+        'max_requests_jitter': int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 200)),
+        'timeout': int(os.environ.get('WEB_TIMEOUT', 60)),
+        'graceful_timeout': int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30)),
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return options
+
+
+def stream_limit(options, mode='production'):
+    """أقصى عدد قنوات SSE (/api/track/stream و/api/dashboard/stream) في العامل الواحد.
+    gevent: أربعة أخماس worker_connections (4000 افتراضياً) والباقي للطلبات العادية.
+    gthread وwaitress: كل قناة تحجز خيطاً طوال عمرها (EVENTS_MAX_AGE)، فنصف الخيوط فقط للقنوات.
+    ما زاد يُرفض بـ 503 + Retry-After فيرجع العميل للاستعلام الدوري"""
+    if not events_enabled():
+        return 0
+    if mode != 'production':
+        # خادم سطح المكتب ينشئ خيطاً لكل طلب
+        return max(1, options['worker_connections'] // 2)
+    if options['worker_class'] in ASYNC_WORKER_CLASSES and sys.platform != 'win32':
+        return max(1, options['worker_connections'] * 4 // 5)
+    # waitress: عملية واحدة بكل الخيوط
+    threads = options['threads'] * (options['workers'] if sys.platform == 'win32' else 1)
+    return max(1, threads // 2)
+
+
+def pre_fork(server, worker):
+    """في العملية الأم قبل fork: أصغر رقم خانة غير مستعمل بين العمال الأحياء.
+    خانة العامل المنتهي (إعادة التدوير بعد max_requests) تُعاد لبديله، فتبقى الخانات أقل من عدد العمال
+    (وضعفه أثناء إعادة التحميل السلسة بـ HUP حين يتعايش العمال القدامى والجدد)"""
+    used = {getattr(other, 'slot', None) for other in server.WORKERS.values()}
+    slot = 0
+    while slot in used:
+        slot += 1
+    worker.slot = slot
+
+
+def make_post_fork(app):
+    """تهيئة عامل gunicorn بعد fork للتطبيق الذي يخدمه فعلاً (تُستعمل أيضاً في wsgi.py للخوادم الخارجية).
+    التطبيق يُمرر ولا يُستورد باسم الوحدة: عند التشغيل بـ python app.py الوحدة هي __main__،
+    واستيراد app من جديد ينشئ نسخة ثانية لا تخدم أي طلب"""
+    def post_fork(server, worker):
+        from models import db
+        # لا يُشارك العامل اتصالات قاعدة البيانات المفتوحة في العملية الأم
+        with app.app_context():
+            db.engine.dispose()
+        # خانة العامل (pre_fork) فريدة بين العمال الأحياء: رقم مختلف لكل عامل في أرقام التتبع
+        app.extensions['tracking_ids'].set_worker(worker.slot)
+    return post_fork
+
+
+def run_gunicorn(app, options):
+    """خادم متعدد العمليات والخيوط (لينكس). إعادة التحميل السلسة: kill -HUP <pid>"""
+    from gunicorn.app.base import BaseApplication
+
+    class ONAServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{options['host']}:{options['port']}")
+            self.cfg.set('workers', options['workers'])
+            self.cfg.set('threads', options['threads'])
+            self.cfg.set('worker_class', options['worker_class'])
+            self.cfg.set('worker_connections', options['worker_connections'])
+            self.cfg.set('max_requests', options['max_requests'])
+            self.cfg.set('max_requests_jitter', options['max_requests_jitter'])
+            self.cfg.set('timeout', options['timeout'])
+            self.cfg.set('graceful_timeout', options['graceful_timeout'])
+            self.cfg.set('pre_fork', pre_fork)
+            self.cfg.set('post_fork', make_post_fork(app))
+            self.cfg.set('accesslog', '-')
+
+        def load(self):
+            return app
+
+    ONAServer().run()
+
+
+def run_waitress(app, options):
+    """خادم متعدد الخيوط لويندوز (لا يدعم العمليات المتعددة ولا إعادة تدوير العمال)"""
+    from waitress import serve
+    serve(app, host=options['host'], port=options['port'],
+          threads=options['workers'] * options['threads'],
+          channel_timeout=options['timeout'])
+
+
+def serve(app, mode='desktop', debug=False, **overrides):
+    """تشغيل التطبيق: desktop (خادم Werkzeug الخفيف) أو production"""
+    options = server_options(mode, **overrides)
+    if 'EVENTS_MAX_SUBSCRIBERS' not in os.environ:
+        app.config['EVENTS_MAX_SUBSCRIBERS'] = stream_limit(options, mode)
+    if mode != 'production':
+        app.run(debug=debug, host=options['host'], port=options['port'], threaded=True)
+        return
+
+    app.config['DEBUG'] = False
+    app.debug = False
+    if options['worker_class'] in ASYNC_WORKER_CLASSES:
+        if 'WEB_THREADS' in os.environ or overrides.get('threads'):
+            print(f"WEB_THREADS/--threads ignored by {options['worker_class']} workers "
+                  f"(concurrency comes from WEB_WORKER_CONNECTIONS)")
+        print(f"Production server on http://{options['host']}:{options['port']} "
+              f"({options['workers']} {options['worker_class']} workers x {options['worker_connections']} connections)")
+    else:
+        print(f"Production server on http://{options['host']}:{options['port']} "
+              f"({options['workers']} workers x {options['threads']} threads)")
+    if sys.platform == 'win32':
+        run_waitress(app, options)
+    else:
+        run_gunicorn(app, options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='تشغيل خادم ONAMob')
+    parser.add_argument('--mode', choices=['desktop', 'production'],
+                        default=os.environ.get('ONA_SERVER_MODE', 'production'))
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--max-requests', type=int)
+    args = parser.parse_args()
+    # يُقرأ عند استيراد app (تخزين القوالب وبصمات static في وضع الإنتاج)
+    os.environ['ONA_SERVER_MODE'] = args.mode
+    patch_async_worker(args.mode)
+
+    from app import app, init_database
+    init_database()
+    serve(app, args.mode, host=args.host, port=args.port, workers=args.workers,
+          threads=args.threads, max_requests=args.max_requests)
+
+
+if __name__ == '__main__':
+    main()
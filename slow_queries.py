@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import WatchedFileHandler
+from flask import request, has_request_context
+from sqlalchemy import event
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """شكل الاستعلام بدون القيم: القيم الحرفية تصبح ? وقوائم IN تُختصر (استعلام واحد مهما تغير عدد العناصر)"""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _IN_LIST.sub('(?...)', statement)
+    return _SPACES.sub(' ', statement).strip()
+
+
+def is_batch(parameters, executemany=False):
+    """executemany بصفوف فعلية. دفعات insertmanyvalues في SQLAlchemy 2 تصل بـ executemany=True
+    لكن معاملاتها صف واحد مسطح (INSERT ... VALUES (...), (...) RETURNING)"""
+    return bool(executemany and isinstance(parameters, (list, tuple)) and parameters and
+                all(isinstance(row, (list, tuple, dict)) for row in parameters))
+
+
+def parameter_shape(parameters, executemany=False):
+    """أنواع المعاملات فقط (لا تُسجل القيم: قد تكون بيانات شخصية أو فهارس عمياء)"""
+    if is_batch(parameters, executemany):
+        return f"{len(parameters)}x[{parameter_shape(parameters[0])}]"
+    if isinstance(parameters, dict):
+        return ','.join(f"{key}:{type(value).__name__}" for key, value in parameters.items())
+    shape = []
+    for value in parameters or ():
+        name = type(value).__name__
+        # تجميع المتتاليات من نفس النوع (قوائم IN الطويلة)
+        if shape and shape[-1][0] == name:
+            shape[-1][1] += 1
+        else:
+            shape.append([name, 1])
+    return ','.join(name if count == 1 else f"{name}*{count}" for name, count in shape)
+
+
+class SlowQueryLog:
+    """سجل الاستعلامات البطيئة (اختياري): كل استعلام أبطأ من SLOW_QUERY_MS يُكتب في ملف السجل
+    مع شكله الموحد، أنواع معاملاته، المسار الذي نفذه وخطة SQLite (EXPLAIN QUERY PLAN)،
+    ويُجمع في ملف SQLite مشترك (SLOW_QUERY_DB) لترتيب أكثر الاستعلامات كلفة في كل العمال معاً.
+    عدة عمال يكتبون في نفس الملف: WatchedFileHandler يعيد فتحه بعد التدوير الخارجي (logrotate)
+    بدلاً من أن يدوره كل عامل بنفسه"""
+
+    def __init__(self, app=None, db=None):
+        self.threshold_ms = 0
+        self.max_entries = 500
+        self.plan_ttl = 600
+        self.path = None
+        self.busy_timeout = 5000
+        self._local = threading.local()
+        self._logger = None
+        if app is not None:
+            self.init_app(app, db)
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def init_app(self, app, db):
+        self.threshold_ms = app.config.get('SLOW_QUERY_MS', 0)
+        self.max_entries = app.config.get('SLOW_QUERY_MAX_ENTRIES', 500)
+        self.plan_ttl = app.config.get('SLOW_QUERY_PLAN_TTL', 600)
+        self.path = app.config.get('SLOW_QUERY_DB')
+        if not self.enabled:
+            return
+
+        self._logger = logging.getLogger('ona.slow_queries')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        log_path = app.config.get('SLOW_QUERY_LOG')
+        if log_path and not self._logger.handlers:
+            handler = WatchedFileHandler(log_path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS slow_queries ("
+                "sql TEXT PRIMARY KEY, count INTEGER NOT NULL, total_ms REAL NOT NULL, max_ms REAL NOT NULL, "
+                "last_ms REAL NOT NULL, last_seen REAL NOT NULL, parameters TEXT, plan TEXT, plan_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS slow_query_routes ("
+                "sql TEXT NOT NULL, route TEXT NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (sql, route)) WITHOUT ROWID"
+            )
+
+        with app.app_context():
+            self.explain_plans = db.engine.dialect.name == 'sqlite'
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor)
+
+    def _connection(self):
+        """اتصال لكل خيط (ويُعاد إنشاؤه بعد fork)؛ ملف منفصل عن قاعدة البيانات الرئيسية لكي لا
+        تمر كتابات السجل بأحداث المحرك المراقب"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path or ':memory:', timeout=self.busy_timeout / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            if self.path:
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_slow_query_start', []).append(time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info['_slow_query_start'].pop()) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+        try:
+            self._record(cursor, statement, parameters, executemany, elapsed_ms)
+        except Exception as e:
+            print(f"خطأ في سجل الاستعلامات البطيئة: {e}")
+
+    def _record(self, cursor, statement, parameters, executemany, elapsed_ms):
+        normalized = normalize_sql(statement)
+        shape = parameter_shape(parameters, executemany)
+        route = (request.url_rule.rule if request.url_rule else request.path) if has_request_context() else 'background'
+        now = time.time()
+
+        store = self._connection()
+        row = store.execute('SELECT plan, plan_at FROM slow_queries WHERE sql = ?', (normalized,)).fetchone()
+        # الخطة تُحسب مرة لكل شكل استعلام (وتُحدث بعد plan_ttl) لكي لا يتضاعف البطء
+        if row is None or now - row[1] > self.plan_ttl:
+            plan = self._explain(cursor, statement, parameters, executemany)
+            plan_at = now
+        else:
+            plan = json.loads(row[0]) if row[0] else None
+            plan_at = row[1]
+
+        store.execute('BEGIN IMMEDIATE')
+        try:
+            store.execute(
+                'INSERT INTO slow_queries (sql, count, total_ms, max_ms, last_ms, last_seen, parameters, plan, plan_at) '
+                'VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(sql) DO UPDATE SET count = count + 1, total_ms = total_ms + excluded.total_ms, '
+                'max_ms = max(max_ms, excluded.max_ms), last_ms = excluded.last_ms, last_seen = excluded.last_seen, '
+                'parameters = excluded.parameters, plan = excluded.plan, plan_at = excluded.plan_at',
+                (normalized, elapsed_ms, elapsed_ms, elapsed_ms, now, shape,
+                 json.dumps(plan, ensure_ascii=False) if plan is not None else None, plan_at)
+            )
+            store.execute(
+                'INSERT INTO slow_query_routes (sql, route, count) VALUES (?, ?, 1) '
+                'ON CONFLICT(sql, route) DO UPDATE SET count = count + 1',
+                (normalized, route)
+            )
+            if row is None:
+                # شكل جديد: إخراج الأقل كلفة إجمالية بعد max_entries
+                store.execute(
+                    'DELETE FROM slow_queries WHERE sql IN (SELECT sql FROM slow_queries '
+                    'ORDER BY total_ms DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+                )
+                store.execute('DELETE FROM slow_query_routes WHERE sql NOT IN (SELECT sql FROM slow_queries)')
+            store.execute('COMMIT')
+        except BaseException:
+            store.execute('ROLLBACK')
+            raise
+
+        self._logger.info(json.dumps({
+            'at': datetime.utcnow().isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            'ms': round(elapsed_ms, 2),
+            'route': route,
+            'sql': normalized,
+            'parameters': shape,
+            'plan': plan
+        }, ensure_ascii=False))
+
+    def _explain(self, cursor, statement, parameters, executemany):
+        if not self.explain_plans or not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        if is_batch(parameters, executemany):
+            parameters = parameters[0]
+        # مؤشر جديد على نفس اتصال DBAPI: لا يمر بأحداث المحرك ولا يغير نتيجة الاستعلام الأصلي
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return [row[-1] for row in explain_cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            explain_cursor.close()
+
+    def top(self, limit=20, sort='total_ms'):
+        """أكثر الاستعلامات كلفة في كل العمال: sort = total_ms | max_ms | count"""
+        if not self.enabled:
+            return []
+        if sort not in ('total_ms', 'max_ms', 'count'):
+            raise ValueError(sort)
+        store = self._connection()
+        rows = store.execute(
+            'SELECT sql, count, total_ms, max_ms, last_ms, last_seen, parameters, plan '
+            f'FROM slow_queries ORDER BY {sort} DESC LIMIT ?', (limit,)
+        ).fetchall()
+        entries = []
+        for sql, count, total_ms, max_ms, last_ms, last_seen, parameters, plan in rows:
+            plan = json.loads(plan) if plan else None
+            entries.append({
+                'sql': sql,
+                'count': count,
+                'total_ms': round(total_ms, 2),
+                'max_ms': round(max_ms, 2),
+                'last_ms': round(last_ms, 2),
+                'avg_ms': round(total_ms / count, 2),
+                'last_seen': last_seen,
+                'parameters': parameters,
+                'plan': plan,
+                'routes': dict(store.execute('SELECT route, count FROM slow_query_routes WHERE sql = ?', (sql,))),
+                # SCAN بدون فهرس = قراءة الجدول كاملاً
+                'full_scan': any(step.startswith('SCAN ') and 'INDEX' not in step for step in plan or ())
+            })
+        return entries
+
+    def reset(self):
+        if not self.enabled:
+            return
+        store = self._connection()
+        store.execute('DELETE FROM slow_queries')
+        store.execute('DELETE FROM slow_query_routes')
@@ -0,0 +1,169 @@
+// تحديث لوحة التحكم مباشرة (Server-Sent Events) دون إعادة تحميل الصفحة
+// الاستعمال في القالب:
+//   <table data-live-dashboard data-center="{{ center_id }}"> ... <tr data-complaint-id="{{ c.id }}">
+//   <td data-field="status">...</td> ... </tr>
+//   <span data-stat="new">{{ stats.new }}</span>
+//   <script src="{{ url_for('static', filename='js/dashboard_live.js') }}" defer></script>
+(function () {
+    'use strict';
+
+    var table = document.querySelector('[data-live-dashboard]');
+    if (!table || !window.EventSource) {
+        return;
+    }
+    var body = table.tBodies[0] || table;
+    var params = new URLSearchParams(window.location.search);
+    // الشكاوى الجديدة تُضاف فقط في الصفحة الأولى وبدون تصفية بحالة أخرى
+    var firstPage = !params.get('after') && !params.get('before') && !params.get('search');
+    var statusFilter = params.get('status') || '';
+    var center = table.getAttribute('data-center') || '';
+    var url = '/api/dashboard/stream' + (center ? '?center=' + encodeURIComponent(center) : '');
+
+    function setField(row, field, value) {
+        var cell = row.querySelector('[data-field="' + field + '"]');
+        if (cell && value !== null && value !== undefined && cell.textContent !== String(value)) {
+            cell.textContent = value;
+            cell.classList.add('live-updated');
+        }
+    }
+
+    function patchRow(row, complaint) {
+        ['tracking_id', 'commune', 'type', 'status', 'assigned_to', 'created_at', 'updated_at'].forEach(function (field) {
+            setField(row, field, complaint[field]);
+        });
+        row.setAttribute('data-status', complaint.status);
+    }
+
+    function newRow(complaint) {
+        // أول صف في الجدول هو القالب (نفس الأعمدة وأزرار الإجراءات)
+        var template = body.querySelector('tr[data-complaint-id]');
+        if (!template) {
+            return null;
+        }
+        var row = template.cloneNode(true);
+        row.setAttribute('data-complaint-id', complaint.id);
+        row.querySelectorAll('[data-complaint-ref]').forEach(function (element) {
+            element.setAttribute('data-complaint-ref', complaint.id);
+        });
+        return row;
+    }
+
+    function applyComplaint(complaint) {
+        var row = body.querySelector('tr[data-complaint-id="' + complaint.id + '"]');
+        if (row) {
+            if (statusFilter && complaint.status !== statusFilter) {
+                row.remove();
+                return;
+            }
+            patchRow(row, complaint);
+        } else if (firstPage && (!statusFilter || complaint.status === statusFilter)) {
+            row = newRow(complaint);
+            if (row) {
+                patchRow(row, complaint);
+                row.classList.add('live-new');
+                body.insertBefore(row, body.firstChild);
+            }
+        }
+    }
+
+    function applyStats(stats) {
+        Object.keys(stats).forEach(function (key) {
+            document.querySelectorAll('[data-stat="' + key + '"]').forEach(function (element) {
+                element.textContent = stats[key];
+            });
+        });
+    }
+
+    // الاستعلام الدوري الخفيف (/api/dashboard/changes) عندما يرفض الخادم القناة (503: كل القنوات مشغولة).
+    // له حد خاص به؛ عند 429 يتوقف حتى Retry-After ولا يمس حد صفحات لوحة التحكم
+    var POLL_INTERVAL = 30000;
+    var STREAM_RETRY = 120000;
+    var source = null;
+    var pollTimer = null;
+    var retryTimer = null;
+    var lastEventId = 0;
+
+    function pollUrl() {
+        var query = new URLSearchParams();
+        if (center) {
+            query.set('center', center);
+        }
+        if (lastEventId) {
+            query.set('since', lastEventId);
+        }
+        return '/api/dashboard/changes?' + query.toString();
+    }
+
+    function schedulePoll(delay) {
+        pollTimer = window.setTimeout(poll, delay);
+    }
+
+    function poll() {
+        var delay = POLL_INTERVAL;
+        fetch(pollUrl(), {
+            credentials: 'same-origin',
+            headers: {'Accept': 'application/json'}
+        }).then(function (response) {
+            if (response.status === 429) {
+                // تجاوز الحد: الانتظار كما يطلب الخادم (أو 10 دقائق)
+                delay = (parseInt(response.headers.get('Retry-After'), 10) || 600) * 1000;
+                return null;
+            }
+            return response.ok ? response.json() : null;
+        }).then(function (data) {
+            if (!data) {
+                return;
+            }
+            applyStats(data.stats);
+            // الأقدم أولاً في الرد: كل شكوى جديدة تُضاف فوق سابقتها
+            data.items.forEach(applyComplaint);
+            lastEventId = data.last_event_id || lastEventId;
+            delay = Math.max(POLL_INTERVAL, (data.poll_interval || 0) * 1000);
+        }).catch(function () {}).then(function () {
+            if (pollTimer !== null) {
+                schedulePoll(delay);
+            }
+        });
+    }
+
+    function startPolling() {
+        if (pollTimer !== null) {
+            return;
+        }
+        pollTimer = 0;
+        poll();
+        // محاولة القناة من جديد لاحقاً
+        retryTimer = window.setTimeout(function () {
+            window.clearTimeout(pollTimer);
+            pollTimer = null;
+            connect();
+        }, STREAM_RETRY);
+    }
+
+    function connect() {
+        source = new EventSource(url);
+        source.addEventListener('complaint', function (event) {
+            lastEventId = parseInt(event.lastEventId, 10) || lastEventId;
+            applyComplaint(JSON.parse(event.data));
+        });
+        source.addEventListener('stats', function (event) {
+            applyStats(JSON.parse(event.data));
+        });
+        // انقطاع الشبكة: EventSource يعيد الاتصال تلقائياً ويرسل Last-Event-ID.
+        // رد غير 200 (503 مثلاً) يغلق القناة نهائياً (CLOSED): الانتقال إلى الاستعلام الدوري
+        source.addEventListener('error', function () {
+            if (source.readyState === EventSource.CLOSED) {
+                startPolling();
+            }
+        });
+    }
+
+    connect();
+
+    window.addEventListener('pagehide', function () {
+        source.close();
+        window.clearTimeout(pollTimer);
+        pollTimer = null;
+        window.clearTimeout(retryTimer);
+    });
+})();
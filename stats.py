@@ -0,0 +1,132 @@
+import time
+import threading
+from sqlalchemy import func, select
+
+# مفاتيح الإحصائيات المعروضة في لوحات التحكم حسب الحالة
+STATUS_KEYS = {
+    'جديد': 'new',
+    'قيد المعالجة': 'in_progress',
+    'حل': 'resolved'
+}
+
+
+class StatusCounters:
+    """عدّادات حالات الشكاوى في الذاكرة، تُحدَّث تدريجياً وتُطابَق دورياً مع الجدول.
+    كل عامل له عداداته: قبل القراءة يُقارن MAX(updated_at) (فهرس، دون مسح الجدول) بالعلامة المحفوظة،
+    فتغييرات العمال الآخرين تظهر بعد STATS_CHECK_INTERVAL ثانية على الأكثر. كتابات هذا العامل
+    تُقدّم العلامة بنفسها (مع الزيادة المحلية تحت نفس القفل) فلا تسبب مطابقة"""
+
+    def __init__(self, app=None, db=None, model=None):
+        self.db = None
+        self.model = None
+        self.reconcile_interval = 300
+        self.check_interval = 2.0
+        self._counts = {}
+        self._loaded_at = None
+        self._checked_at = 0.0
+        self._marker = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        self.db = db
+        self.model = model
+        self.reconcile_interval = app.config.get('STATS_RECONCILE_INTERVAL', 300)
+        self.check_interval = app.config.get('STATS_CHECK_INTERVAL', 2.0)
+
+    def _current_marker(self):
+        # كل إضافة أو تعديل يغير updated_at (لا تُحذف الشكاوى)
+        return self.db.session.query(func.max(self.model.updated_at)).scalar()
+
+    def marker_excluding(self, ids):
+        """آخر updated_at لغير الصفوف ids. يُستدعى بعد flush وقبل commit: قفل الكتابة محجوز،
+        فلا يُثبت عامل آخر شيئاً بين هذه القراءة وcommit"""
+        return self.db.session.query(self.model.updated_at) \
+            .filter(self.model.id.notin_(ids)) \
+            .order_by(self.model.updated_at.desc()).limit(1).scalar()
+
+    def reconcile(self):
+        """إعادة حساب العدادات باستعلام GROUP BY (status, center_id) واحد"""
+        # العلامة والعدد من نفس الاستعلام (نفس لقطة قاعدة البيانات)
+        marker = select(func.max(self.model.updated_at)).scalar_subquery()
+        rows = self.db.session.query(
+            self.model.center_id, self.model.status, func.count(self.model.id), marker
+        ).group_by(self.model.center_id, self.model.status).all()
+        counts = {(center_id, status): count for center_id, status, count, _ in rows}
+        with self._lock:
+            self._counts = counts
+            self._marker = rows[0][3] if rows else None
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > self.reconcile_interval:
+            self.reconcile()
+            return
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        # تغيير من عامل آخر: مطابقة واحدة ثم تعود القراءة من الذاكرة
+        if self._current_marker() != self._marker:
+            self.reconcile()
+
+    def _apply(self, deltas, written_at, previous_marker):
+        """زيادة العدادات بعد نجاح الحفظ وتقديم العلامة إلى updated_at هذه الكتابة.
+        previous_marker: آخر تغيير لغيرنا عند الكتابة (marker_excluding)"""
+        with self._lock:
+            # قبل أول تحميل لا فائدة من التحديث، المطابقة ستقرأ القيم الحقيقية
+            if self._loaded_at is None:
+                return
+            # مطابقة جرت بعد commit: الكتابة محسوبة فيها أصلاً
+            if self._marker is not None and written_at is not None and self._marker >= written_at:
+                return
+            for key, delta in deltas.items():
+                self._counts[key] = self._counts.get(key, 0) + delta
+            # العلامة تتقدم فقط إذا لم يفتنا تغيير من عامل آخر (وإلا يكتشفه الفحص التالي)
+            if written_at is not None and self._marker == previous_marker:
+                self._marker = written_at
+
+    def record_new(self, items, written_at=None, previous_marker=None):
+        """تسجيل شكاوى جديدة بعد نجاح الحفظ: items = [(center_id, status), ...]"""
+        deltas = {}
+        for key in items:
+            deltas[key] = deltas.get(key, 0) + 1
+        self._apply(deltas, written_at, previous_marker)
+
+    def record_transition(self, center_id, old_status, new_status, written_at=None, previous_marker=None):
+        """تسجيل تغيير حالة شكوى بعد نجاح الحفظ"""
+        if old_status == new_status:
+            deltas = {}
+        else:
+            deltas = {(center_id, old_status): -1, (center_id, new_status): 1}
+        # حتى دون تغيير الحالة تتقدم العلامة (تغيرت الملاحظات وupdated_at)
+        self._apply(deltas, written_at, previous_marker)
+
+    def snapshot(self, center_id=None):
+        """إحصائيات لوحة التحكم (للكل أو لمركز واحد) من الذاكرة"""
+        self._ensure_fresh()
+        stats = {'total': 0, 'new': 0, 'in_progress': 0, 'resolved': 0}
+        with self._lock:
+            for (center, status), count in self._counts.items():
+                if center_id is not None and center != center_id:
+                    continue
+                stats['total'] += count
+                key = STATUS_KEYS.get(status)
+                if key:
+                    stats[key] += count
+        return stats
+
+    def expire(self):
+        """طلب إعادة المطابقة عند القراءة التالية (تغييرات من عمال آخرين)"""
+        with self._lock:
+            self._loaded_at = None
+
+    def stats(self):
+        """عمر العدادات منذ آخر مطابقة"""
+        return {
+            'loaded': self._loaded_at is not None,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            'reconcile_interval': self.reconcile_interval,
+            'check_interval': self.check_interval
+        }
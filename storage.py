@@ -0,0 +1,94 @@
+import os
+from sqlalchemy import event, inspect, text
+
+
+def sqlite_pragmas():
+    """إعدادات SQLite المطبقة على كل اتصال (قابلة للتغيير من متغيرات البيئة)"""
+    return {
+        # WAL: القراءة لا تحجب الكتابة والعكس
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        # NORMAL آمن مع WAL وأسرع بكثير من FULL
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        # انتظار القفل بالميلي ثانية بدلاً من "database is locked" فوراً
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        # قيمة سالبة = بالكيلوبايت (64 ميغابايت)
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+    }
+
+
+def engine_options():
+    """إعدادات مجمع الاتصالات لخادم متعدد الخيوط"""
+    busy_timeout = sqlite_pragmas()['busy_timeout']
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 3600)),
+        'connect_args': {
+            'timeout': busy_timeout / 1000,
+            # الاتصال ينتقل بين خيوط الخادم عبر المجمع
+            'check_same_thread': False,
+        },
+    }
+
+
+def configure_storage(app):
+    """ضبط إعدادات المحرك قبل db.init_app"""
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
+
+
+def apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def init_storage(app, db):
+    """تسجيل تطبيق الإعدادات على كل اتصال جديد بعد db.init_app"""
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', apply_pragmas)
+
+
+def storage_report(db):
+    """الإعدادات الفعلية كما يراها SQLite (تُطبع عند بدء التشغيل)"""
+    engine = db.engine
+    report = {'url': engine.url.render_as_string(hide_password=True), 'pool': engine.pool.status()}
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as conn:
+            for name in sqlite_pragmas():
+                report[name] = conn.execute(text(f"PRAGMA {name}")).scalar()
+    return report
+
+
+def print_storage_report(db):
+    print("إعدادات التخزين:")
+    for key, value in storage_report(db).items():
+        print(f"  {key}: {value}")
+
+
+def upgrade_schema(db):
+    """إضافة الأعمدة والفهارس الجديدة إلى قاعدة بيانات قائمة (create_all لا يعدل الجداول الموجودة).
+    يدعم فقط الأعمدة التي تقبل NULL، وهي كل ما نضيفه بعد الإصدار الأول"""
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"تمت إضافة العمود {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
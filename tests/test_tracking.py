@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from tracking import ALPHABET, TrackingIdGenerator, check_char, normalize_tracking_id
+from server import pre_fork
+
+
+def test_generate_format_and_check_char():
+    tracking_id = TrackingIdGenerator(node_id=3).generate('MA')
+    prefix, center, *groups = tracking_id.split('-')
+    assert (prefix, center) == ('ONA', 'MA')
+    compact = ''.join(groups)
+    assert len(compact) == 11 and all(char in ALPHABET for char in compact)
+    assert check_char('MA' + compact[:-1]) == compact[-1]
+
+
+def test_generate_is_unique_within_a_second():
+    generator = TrackingIdGenerator(node_id=0)
+    ids = [generator.generate('MA') for _ in range(5000)]
+    assert len(set(ids)) == len(ids)
+
+
+def test_workers_do_not_collide():
+    first, second = TrackingIdGenerator(), TrackingIdGenerator()
+    first.set_worker(0)
+    second.set_worker(1)
+    ids = {first.generate('MA') for _ in range(500)} | {second.generate('MA') for _ in range(500)}
+    assert len(ids) == 1000
+
+
+def test_normalize_accepts_typing_variants():
+    tracking_id = TrackingIdGenerator(node_id=7).generate('FJ')
+    compact = tracking_id.replace('-', '').lower()
+    assert normalize_tracking_id(compact) == tracking_id
+    assert normalize_tracking_id(f"  {tracking_id.replace('-', ' ')} ") == tracking_id
+    # O و I و L تُقرأ 0 و 1
+    assert normalize_tracking_id(tracking_id.replace('0', 'O').replace('1', 'I')) == tracking_id
+
+
+def test_normalize_rejects_wrong_check_char():
+    tracking_id = TrackingIdGenerator(node_id=7).generate('FJ')
+    wrong = ALPHABET[(ALPHABET.index(tracking_id[-1]) + 1) % 32]
+    assert normalize_tracking_id(tracking_id[:-1] + wrong) is None
+
+
+def test_normalize_keeps_legacy_and_unknown_ids():
+    assert normalize_tracking_id('ona-20240105123000') == 'ONA-20240105123000'
+    assert normalize_tracking_id('ONA20240105123000') == 'ONA-20240105123000'
+    assert normalize_tracking_id(' abc ') == 'abc'
+    assert normalize_tracking_id('') is None
+
+
+def test_pre_fork_reuses_slots_of_dead_workers():
+    server = SimpleNamespace(WORKERS={})
+    workers = []
+    for pid in range(4):
+        worker = SimpleNamespace()
+        pre_fork(server, worker)
+        server.WORKERS[pid] = worker
+        workers.append(worker)
+    assert [worker.slot for worker in workers] == [0, 1, 2, 3]
+
+    # إعادة تدوير العامل ذي الخانة 1 عدة مرات: بديله يأخذ نفس الخانة دائماً
+    for pid in range(4, 100):
+        dead = next(key for key, worker in server.WORKERS.items() if worker.slot == 1)
+        del server.WORKERS[dead]
+        replacement = SimpleNamespace()
+        pre_fork(server, replacement)
+        server.WORKERS[pid] = replacement
+        assert replacement.slot == 1
+    assert sorted(worker.slot for worker in server.WORKERS.values()) == [0, 1, 2, 3]
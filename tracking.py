@@ -0,0 +1,112 @@
+import os
+import re
+import time
+import threading
+
+# أبجدية Crockford Base32: بدون I و L و O و U لتفادي الالتباس عند الإملاء بالهاتف
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ALPHABET_INDEX = {char: i for i, char in enumerate(ALPHABET)}
+# الحروف التي تُسمع أو تُكتب خطأً تُرد إلى مقابلها
+CONFUSABLE = str.maketrans({'O': '0', 'I': '1', 'L': '1'})
+
+PREFIX = 'ONA'
+EPOCH = 1704067200  # 2024-01-01 UTC
+TIME_BITS, NODE_BITS, SEQ_BITS = 30, 10, 10
+BODY_LENGTH = 10  # 50 بت = 10 حروف
+
+LEGACY_PATTERN = re.compile(r'^ONA-\d{14}$')
+
+
+def check_char(payload):
+    """حرف التحقق (Luhn mod 32) على رمز المركز والجسم"""
+    factor = 2
+    total = 0
+    for char in reversed(payload):
+        addend = factor * ALPHABET_INDEX[char]
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(32 - total % 32) % 32]
+
+
+def format_tracking_id(center_code, body):
+    """الشكل المعروض: ONA-CC-XXXX-XXXX-XXC (مجموعات قصيرة سهلة القراءة)"""
+    payload = center_code + body
+    full = body + check_char(payload)
+    return f"{PREFIX}-{center_code}-{full[:4]}-{full[4:8]}-{full[8:]}"
+
+
+class TrackingIdGenerator:
+    """مولد أرقام تتبع فريدة دون الرجوع إلى قاعدة البيانات:
+    الثواني منذ 2024 + رقم العامل + عداد تسلسلي داخل الثانية.
+    رقم العامل = TRACKING_NODE_ID (أساس الخادم، افتراضياً 0) + خانة العامل التي يحددها خادم الإنتاج
+    (server.pre_fork) ويمررها بعد fork عبر set_worker. الخانة أقل من عدد العمال وتُعاد خانة العامل المنتهي
+    لبديله (ضعف العدد أثناء إعادة التحميل السلسة)، فعلى عدة خوادم تُعطى أسس متباعدة بضعف عدد العمال
+    (8 عمال: 0، 16، 32...) حتى 1024 رقماً"""
+
+    def __init__(self, node_id=None):
+        if node_id is None:
+            node_id = int(os.environ.get('TRACKING_NODE_ID', 0))
+        self.base = node_id
+        self.node_id = node_id % (1 << NODE_BITS)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._last_second = 0
+        self._sequence = 0
+
+    def set_worker(self, index):
+        """يُستدعى في العامل بعد fork (post_fork): خانة العامل فريدة بين العمال الأحياء"""
+        with self._lock:
+            self._pid = os.getpid()
+            self.node_id = (self.base + index) % (1 << NODE_BITS)
+            self._last_second = 0
+
+    def _next_value(self):
+        with self._lock:
+            # fork دون set_worker (خادم خارجي): رقم العملية يُضاف إلى الأساس
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.node_id = (self.base + self._pid) % (1 << NODE_BITS)
+                self._last_second = 0
+            # لا نرجع إلى الوراء أبداً حتى لو تأخرت ساعة النظام
+            second = max(int(time.time()) - EPOCH, self._last_second)
+            if second == self._last_second:
+                self._sequence += 1
+                if self._sequence >= (1 << SEQ_BITS):
+                    # استنفاد العداد: نستعير الثانية التالية
+                    second += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_second = second
+            return (second % (1 << TIME_BITS)) << (NODE_BITS + SEQ_BITS) | self.node_id << SEQ_BITS | self._sequence
+
+    def generate(self, center_code):
+        value = self._next_value()
+        body = ''
+        for _ in range(BODY_LENGTH):
+            body = ALPHABET[value & 31] + body
+            value >>= 5
+        return format_tracking_id(center_code, body)
+
+
+def normalize_tracking_id(raw):
+    """توحيد رقم التتبع المُدخل؛ يرجع None إذا كان بالشكل الجديد وحرف التحقق خاطئ.
+    الأرقام القديمة (ONA-YYYYmmddHHMMSS) تُرجع كما هي"""
+    if not raw:
+        return None
+    value = raw.strip().upper()
+    if LEGACY_PATTERN.match(value):
+        return value
+    compact = re.sub(r'[\s\-_.]', '', value)
+    if compact.startswith(PREFIX):
+        compact = compact[len(PREFIX):]
+    if compact.isdigit() and len(compact) == 14:
+        return f"{PREFIX}-{compact}"
+    compact = compact.translate(CONFUSABLE)
+    if len(compact) != 2 + BODY_LENGTH + 1 or any(char not in ALPHABET_INDEX for char in compact):
+        # شكل غير معروف: نتركه للبحث العادي للتوافق مع البيانات القديمة
+        return raw.strip()
+    center_code, body, check = compact[:2], compact[2:-1], compact[-1]
+    if check_char(center_code + body) != check:
+        return None
+    return format_tracking_id(center_code, body)
@@ -0,0 +1,9 @@
+from app import app as application, init_database
+from server import make_post_fork, pre_fork  # noqa: F401 (pre_fork: خانة كل عامل في أرقام التتبع)
+
+# نقطة الدخول لخوادم WSGI الخارجية: gunicorn -c python:wsgi wsgi:application
+# تُنشأ الجداول ويُرقى المخطط عند الاستيراد (gunicorn -c python:wsgi يستورده في العملية الرئيسية قبل العمال)
+init_database()
+
+# إعداد gunicorn: كل عامل يغلق اتصالات العملية الأم ويأخذ رقماً خاصاً في أرقام التتبع
+post_fork = make_post_fork(application)